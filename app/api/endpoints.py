@@ -1,49 +1,126 @@
 import asyncio
+from contextlib import aclosing
 from time import time
+from typing import Optional
 
-from fastapi.responses import StreamingResponse
-from fastapi import Header, Query
+from fastapi.responses import Response
+from fastapi import Header, Query, Request
 
+from app.api.stream_admission import AdmittedStreamingResponse, StreamAdmission
 from app.config import Config
+from app.stream_workers import StreamWorkers
+from app.tg.chunk_cache import ChunkCache
+from app.tg.client_pool import ClientPool
+from app.tg.coalescer import EditCoalescer, EditDebouncer, MediaInfoBatcher
+from app.tg.dedup import RequestDeduplicator
+from app.tg.media_cache import MediaReuseCache
+from app.tg.media_store import MediaStore
+from app.tg.media_stream import DownloadEngine, MediaDescriptors, MediaStream, StreamFanOut
+from app.tg.scheduler import ActionScheduler
+from app.tg.tg_tools import TgTools
+from app.tg.thumbnails import ThumbnailService
+from app.tg.uploader import MediaUploader
 
 
 @Config.REST_APP.get("/internal/stream/{chat_id}/{msg_id}")
-async def stream_video_from_tg(chat_id: int, msg_id: int, offset: int = Query(0)):
+async def stream_video_from_tg(
+        request: Request, chat_id: int, msg_id: int, offset: int = Query(0),
+        range_header: Optional[str] = Header(None, alias="Range")):
+    ticket = await StreamAdmission.acquire(request)
+    if ticket is None:
+        Config.LOGGER.warning(f"Stream rejected, over capacity! chat_id: {chat_id}; msg_id: {msg_id}")
+        return Response(status_code=503, headers={"Retry-After": str(Config.STREAM_RETRY_AFTER)})
+
+    client = ClientPool.client()
+    try:
+        descriptor = await MediaDescriptors.get(client, chat_id, msg_id)
+
+    except BaseException:
+        await StreamAdmission.release(ticket)
+        raise
+
+    if descriptor is None:
+        await StreamAdmission.release(ticket)
+        Config.LOGGER.warning(f"No media found for the specified parameters! chat_id: {chat_id}; msg_id: {msg_id}")
+        return Response(status_code=404)
+
+    size = descriptor.size
+    byte_range = await MediaStream.parse_range(range_header, size)
+    if byte_range is not None and byte_range[0] >= size:
+        await StreamAdmission.release(ticket)
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range or (min(offset, size), size - 1)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
     async def generate_chunks():
-        start_time = time.time()
+        start_time = time()
+        sent = 0
         chunk_count = 0
+        chunks = MediaStream.iter_range(client, descriptor, start, end)
 
         try:
-            msg = await Config.TG_CLIENT.get_messages(chat_id, ids=msg_id)
-            if not msg or not msg.media:
-                Config.LOGGER.warning(
-                    f"No media found for the specified parameters! chat_id: {chat_id}; msg_id: {msg_id}")
-                return
+            Config.LOGGER.info(f"Starting video stream! msg_id: {msg_id}; range: {start}-{end}/{size}")
 
-            Config.LOGGER.info(f"Starting video stream! msg_id: {msg_id}; DC switch took: {time}")
+            async with aclosing(chunks):
+                async for chunk in chunks:
+                    chunk_count += 1
+                    sent += len(chunk)
 
-            async for chunk in Config.TG_CLIENT.iter_download(
-                    msg.media, offset=offset, chunk_size=524288, request_size=524288):
-                chunk_count += 1
+                    if chunk_count % 10 == 0:
+                        elapsed = time() - start_time
+                        Config.LOGGER.info(
+                            f"Video stream {msg_id} | Sent {chunk_count} chunks {sent / 1048576:.1f}MB. "
+                            f"Speed: {sent / 1048576 / elapsed:.2f} MB/s")
 
-                if chunk_count % 10 == 0:
-                    elapsed = time() - start_time
-                    Config.LOGGER.info(
-                        f"Video stream {msg_id} | Sent {chunk_count} chunks {chunk_count * 0.5}MB. Speed: {(chunk_count * 0.5) / elapsed:.2f} MB/s")
+                    yield chunk
 
-                yield chunk
-
-        except (ConnectionResetError, asyncio.CancelledError):
+        except ConnectionResetError:
             print(f"[{msg_id}] Stream interrupted by client (Connection Reset)")
 
         except Exception as ex:
             Config.LOGGER.error(ex)
 
-    return StreamingResponse(
+    return AdmittedStreamingResponse(
         generate_chunks(),
-        media_type="video/mp4",
-        headers={
-            "Accept-Ranges": "bytes",
-            "Content-Type": "video/mp4",
-        }
+        ticket=ticket,
+        status_code=206 if byte_range is not None else 200,
+        media_type=descriptor.mime_type,
+        headers=headers
     )
+
+
+@Config.REST_APP.get("/internal/thumb/{chat_id}/{msg_id}")
+async def thumbnail_from_tg(chat_id: int, msg_id: int):
+    thumb = await ThumbnailService.get(ClientPool.client(), chat_id, msg_id)
+    if thumb is None:
+        Config.LOGGER.warning(f"No preview found for the specified parameters! chat_id: {chat_id}; msg_id: {msg_id}")
+        return Response(status_code=404)
+
+    data, mime_type = thumb
+    return Response(content=data, media_type=mime_type, headers={"Cache-Control": "public, max-age=86400"})
+
+
+@Config.REST_APP.get("/internal/metrics")
+async def metrics():
+    return {
+        "scheduler": await ActionScheduler.stats(),
+        "edit_coalescer": await EditCoalescer.stats(),
+        "inbound_edit_debouncer": await EditDebouncer.stats(),
+        "media_info_batcher": await MediaInfoBatcher.stats(),
+        "client_pool": await ClientPool.stats(),
+        "dedup": await RequestDeduplicator.stats(),
+        "media_reuse": await MediaReuseCache.stats(),
+        "uploads": await MediaUploader.stats(),
+        "streams": await DownloadEngine.stats(),
+        "stream_admission": await StreamAdmission.stats(),
+        "stream_cache": await ChunkCache.stats(),
+        "stream_fan_out": await StreamFanOut.stats(),
+        "stream_workers": await StreamWorkers.stats(),
+        "stream_descriptors": await MediaDescriptors.stats(),
+        "thumbnails": await ThumbnailService.stats(),
+        "media_store": await MediaStore.stats(),
+        "media_info_cache": await TgTools.media_cache_stats(),
+    }
@@ -0,0 +1,106 @@
+import json
+from typing import List, Optional
+
+from aiokafka import AIOKafkaProducer
+from aiokafka.errors import KafkaConnectionError
+from pydantic import BaseModel
+
+from app.api.webhook import APIInterface
+from app.config import Config
+from app.utils import Utils as Ut
+
+
+class KafkaEventsSink:
+    PRODUCER: Optional[AIOKafkaProducer] = None
+
+    @classmethod
+    async def init_producer(cls) -> bool:
+        if cls.PRODUCER is not None:
+            return True
+
+        producer = AIOKafkaProducer(
+            bootstrap_servers=Config.KAFKA_BOOTSTRAP_IP,
+            acks=1,
+            linger_ms=Config.EVENTS_KAFKA_LINGER_MS,
+            max_batch_size=Config.EVENTS_KAFKA_BATCH_SIZE,
+            compression_type=Config.EVENTS_KAFKA_COMPRESSION or None,
+            value_serializer=lambda v: json.dumps(v, ensure_ascii=False).encode("utf-8"),
+            key_serializer=lambda k: k.encode("utf-8")
+        )
+
+        try:
+            await producer.start()
+            cls.PRODUCER = producer
+            Config.LOGGER.info("Kafka events producer has been init")
+            return True
+
+        except KafkaConnectionError as ex:
+            Config.LOGGER.critical(f"Kafka events producer connection error! ex: {ex}")
+            return False
+
+    @staticmethod
+    def on_delivery(future, event_type: str):
+        if future.cancelled():
+            return
+
+        ex = future.exception()
+        if ex:
+            Config.LOGGER.error(f"KafkaEventsSink | Failed to deliver {event_type} event! ex: {ex}")
+
+    @classmethod
+    async def publish(cls, req_model: BaseModel):
+        if cls.PRODUCER is None and not await cls.init_producer():
+            return None
+
+        event_type = req_model.type
+        topic = Config.EVENTS_TOPICS.get(event_type, Config.EVENTS_TOPIC_DEFAULT)
+
+        try:
+            delivery = await cls.PRODUCER.send(topic=topic, key=str(req_model.chat_id), value=req_model.model_dump())
+
+        except Exception as ex:
+            Config.LOGGER.error(f"KafkaEventsSink.publish | {ex}")
+            return None
+
+        delivery.add_done_callback(lambda f: KafkaEventsSink.on_delivery(f, event_type))
+        return delivery
+
+    @classmethod
+    async def stop(cls):
+        if cls.PRODUCER is not None:
+            await cls.PRODUCER.stop()
+            cls.PRODUCER = None
+
+
+class EventsSink:
+    SINK_WEBHOOK = "webhook"
+    SINK_KAFKA = "kafka"
+    SINK_BOTH = "both"
+
+    @staticmethod
+    async def sinks_for(event_type: str) -> List[str]:
+        route = Config.EVENTS_SINK_ROUTES.get(event_type, Config.EVENTS_SINK_DEFAULT)
+        if route == EventsSink.SINK_BOTH:
+            return [EventsSink.SINK_WEBHOOK, EventsSink.SINK_KAFKA]
+
+        if route == EventsSink.SINK_KAFKA:
+            return [EventsSink.SINK_KAFKA]
+
+        return [EventsSink.SINK_WEBHOOK]
+
+    @staticmethod
+    async def uses_kafka() -> bool:
+        routes = list(Config.EVENTS_SINK_ROUTES.values()) + [Config.EVENTS_SINK_DEFAULT]
+        return any(route in (EventsSink.SINK_KAFKA, EventsSink.SINK_BOTH) for route in routes)
+
+    @staticmethod
+    async def publish(req_model: BaseModel):
+        answer = None
+        for sink in await EventsSink.sinks_for(req_model.type):
+            if sink == EventsSink.SINK_KAFKA:
+                await KafkaEventsSink.publish(req_model)
+
+            else:
+                answer = await APIInterface.send_request(utils_obj=Ut, req_model=req_model)
+
+        return answer
@@ -1,13 +1,19 @@
 import json
 import os
 import traceback
+from functools import partial
 
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
+from aiokafka import AIOKafkaConsumer, AIOKafkaProducer, TopicPartition
 from aiokafka.errors import KafkaConnectionError
+from aiokafka.partitioner import DefaultPartitioner
+from pydantic import ValidationError
 
 from app.config import Config
 from app.api.kafka_models import *
 from app.tg.actions import UserActions
+from app.tg.coalescer import EditCoalescer, MediaInfoBatcher
+from app.tg.dedup import RequestDeduplicator
+from app.tg.scheduler import ActionScheduler
 from app.utils import Utils as Ut
 
 
@@ -43,7 +49,7 @@ class KafkaInterface:
             cls.CONSUMER = AIOKafkaConsumer(
                 Config.KAFKA_TOPIC_COMMANDS,
                 bootstrap_servers=Config.KAFKA_BOOTSTRAP_IP,
-                group_id="demo-group",
+                group_id=Config.KAFKA_GROUP_ID,
                 auto_offset_reset="earliest",
                 enable_auto_commit=True,
                 value_deserializer=lambda v: json.loads(v.decode("utf-8")),
@@ -58,63 +64,106 @@ class KafkaInterface:
                 return False
 
     @staticmethod
-    async def coroutine_from_payload(payload):
+    async def action_from_payload(payload) -> Optional[partial]:
         rt = payload.get("request_type")
         if not rt:
             return None
 
         payload.pop("request_type")
         if rt == "send_message":
-            return UserActions.send_message(SendMessageRequest(**payload))
+            return partial(UserActions.send_message, SendMessageRequest(**payload))
 
         elif rt == "edit_message":
-            return UserActions.edit_message(EditMessageRequest(**payload))
+            return partial(UserActions.edit_message, EditMessageRequest(**payload))
 
         elif rt == "delete_message":
-            return UserActions.delete_message(DeleteMessageRequest(**payload))
+            return partial(UserActions.delete_message, DeleteMessageRequest(**payload))
+
+        elif rt == "delete_message_bulk":
+            return partial(UserActions.delete_message_bulk, DeleteMessageBulkRequest(**payload))
 
         elif rt == "message_pin":
-            return UserActions.message_pin(MessagePinRequest(**payload))
+            return partial(UserActions.message_pin, MessagePinRequest(**payload))
+
+        elif rt == "message_pin_bulk":
+            return partial(UserActions.message_pin_bulk, MessagePinBulkRequest(**payload))
 
         elif rt == "message_unpin":
-            return UserActions.message_unpin(MessageUnpinRequest(**payload))
+            return partial(UserActions.message_unpin, MessageUnpinRequest(**payload))
 
         elif rt == "send_photo":
-            return UserActions.send_photo(SendPhotoRequest(**payload))
+            return partial(UserActions.send_photo, SendPhotoRequest(**payload))
 
         elif rt == "send_video":
-            return UserActions.send_video(SendVideoRequest(**payload))
+            return partial(UserActions.send_video, SendVideoRequest(**payload))
 
         elif rt == "send_audio":
-            return UserActions.send_audio(SendAudioRequest(**payload))
+            return partial(UserActions.send_audio, SendAudioRequest(**payload))
 
         elif rt == "send_document":
-            return UserActions.send_document(SendDocumentRequest(**payload))
+            return partial(UserActions.send_document, SendDocumentRequest(**payload))
+
+        elif rt == "send_media_group":
+            return partial(UserActions.send_media_group, SendMediaGroupRequest(**payload))
 
         elif rt == "send_sticker":
-            return UserActions.send_sticker(SendStickerRequest(**payload))
+            return partial(UserActions.send_sticker, SendStickerRequest(**payload))
 
         elif rt == "send_voice":
-            return UserActions.send_voice(SendVoiceRequest(**payload))
+            return partial(UserActions.send_voice, SendVoiceRequest(**payload))
 
         elif rt == "send_gif":
-            return UserActions.send_gif(SendGIFRequest(**payload))
+            return partial(UserActions.send_gif, SendGIFRequest(**payload))
 
         elif rt == "create_topic":
-            return UserActions.create_topic(CreateTopicRequest(**payload))
+            return partial(UserActions.create_topic, CreateTopicRequest(**payload))
 
         elif rt == "edit_topic":
-            return UserActions.edit_topic(EditTopicRequest(**payload))
+            return partial(UserActions.edit_topic, EditTopicRequest(**payload))
 
         elif rt == "delete_topic":
-            return UserActions.delete_topic(DeleteTopicRequest(**payload))
+            return partial(UserActions.delete_topic, DeleteTopicRequest(**payload))
 
         elif rt == "media_file_info":
-            return UserActions.get_media_file_info(MediaFileInfoRequest(**payload))
+            return partial(UserActions.get_media_file_info, MediaFileInfoRequest(**payload))
+
+        elif rt == "media_file_info_bulk":
+            return partial(UserActions.get_media_file_info_bulk, MediaFileInfoBulkRequest(**payload))
 
         else:
             return None
 
+    @classmethod
+    async def owns_chat(cls, chat_id: int, msg_key: Optional[bytes]) -> bool:
+        key = str(chat_id).encode("utf-8")
+        if msg_key == key:
+            return True
+
+        partitions = cls.CONSUMER.partitions_for_topic(Config.KAFKA_TOPIC_COMMANDS)
+        if not partitions:
+            return True
+
+        all_partitions = sorted(partitions)
+        target = DefaultPartitioner()(key, all_partitions, all_partitions)
+        return TopicPartition(Config.KAFKA_TOPIC_COMMANDS, target) in cls.CONSUMER.assignment()
+
+    @classmethod
+    async def forward_command(cls, msg, chat_id: int) -> bool:
+        hops = int(dict(msg.headers or []).get("x-cluster-hops", b"0"))
+        if hops >= Config.CLUSTER_MAX_HOPS:
+            return False
+
+        try:
+            await cls.PRODUCER.send_and_wait(
+                topic=Config.KAFKA_TOPIC_COMMANDS, key=str(chat_id), value=msg.value,
+                headers=[("x-cluster-hops", str(hops + 1).encode("utf-8"))]
+            )
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"KafkaInterface | Unable to forward command for chat_id {chat_id}! ex: {ex}")
+            return False
+
     @classmethod
     async def start_polling(cls) -> Optional[bool]:
         await Ut.log("Kafka listener has been started!")
@@ -129,22 +178,50 @@ class KafkaInterface:
             async for msg in cls.CONSUMER:
                 print(f"{msg.topic}:{msg.partition}@{msg.offset} key={msg.key} value={msg.value}")
 
-                payload_coroutine = await cls.coroutine_from_payload(msg.value)
-                if payload_coroutine:
-                    print("new payload_coroutine")
-                    await Config.QUEUE_WORKER.put(payload_coroutine)
+                chat_id = msg.value.get("chat_id")
+                if Config.CLUSTER_MODE and chat_id is not None and not await cls.owns_chat(chat_id, msg.key):
+                    if await cls.forward_command(msg, chat_id):
+                        continue
+
+                request_type = msg.value.get("request_type")
+                priority = msg.value.pop("priority", None)
+                try:
+                    action = await cls.action_from_payload(msg.value)
+
+                except ValidationError as ex:
+                    Config.LOGGER.error(f"KafkaInterface | Invalid {request_type} payload! ex: {ex}")
+                    continue
+
+                if not action:
+                    continue
+
+                request_id = action.args[0].request_id
+                if await RequestDeduplicator.is_duplicate(request_id, request_type):
+                    continue
+
+                if request_type == "edit_message":
+                    await EditCoalescer.submit(payload=action.args[0], action=action, priority=priority)
+
+                elif request_type == "media_file_info":
+                    await MediaInfoBatcher.submit(payload=action.args[0], action=action, priority=priority)
+
+                else:
+                    await ActionScheduler.submit(
+                        chat_id=action.args[0].chat_id, request_type=request_type, action=action, priority=priority,
+                        request_id=request_id
+                    )
 
         finally:
             await cls.CONSUMER.stop()
 
     @classmethod
-    async def send_msg(cls, payload: BaseModel, topic: str):
+    async def send_msg(cls, payload: BaseModel, topic: str, request_type: str = "media_file_info"):
         if cls.PRODUCER is None:
             await cls.init_producer()
 
         data = payload.model_dump()
         data["request_id"] = payload.request_id
-        data["request_type"] = "media_file_info"
+        data["request_type"] = request_type
 
         try:
             metadata = await cls.PRODUCER.send_and_wait(topic=topic, key=data["request_id"], value=data)
@@ -1,6 +1,6 @@
-from typing import Optional
+from typing import Optional, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PhotoData(BaseModel):
@@ -65,6 +65,37 @@ class MediaFileInfoResponse(BaseModel):
     media_info: Optional[MediaFileInfo] = None
 
 
+class MediaFileInfoItem(BaseModel):
+    message_id: int
+    status: str
+    media_info: Optional[MediaFileInfo] = None
+
+
+class MediaFileInfoBulkResponse(BaseModel):
+    status: str
+    request_id: str
+    items: List[MediaFileInfoItem]
+
+
+class BulkItemResult(BaseModel):
+    message_id: int
+    status: str
+    error: Optional[str] = None
+
+
+class BulkActionResponse(BaseModel):
+    status: str
+    request_id: str
+    results: List[BulkItemResult]
+
+
+class ActionResponse(BaseModel):
+    status: str
+    request_id: str
+    message_ids: List[int] = []
+    merged_into: Optional[str] = None
+
+
 class SendMessageRequest(BaseModel):
     request_id: str
     chat_id: int
@@ -89,12 +120,24 @@ class DeleteMessageRequest(BaseModel):
     message_id: int
 
 
+class DeleteMessageBulkRequest(BaseModel):
+    request_id: str
+    chat_id: int
+    message_ids: List[int]
+
+
 class MessagePinRequest(BaseModel):
     request_id: str
     chat_id: int
     message_id: int
 
 
+class MessagePinBulkRequest(BaseModel):
+    request_id: str
+    chat_id: int
+    message_ids: List[int]
+
+
 class MessageUnpinRequest(BaseModel):
     request_id: str
     chat_id: int
@@ -137,6 +180,19 @@ class SendDocumentRequest(BaseModel):
     parse_mode: str
 
 
+class MediaGroupItem(BaseModel):
+    file: str
+    caption: Optional[str] = None
+
+
+class SendMediaGroupRequest(BaseModel):
+    request_id: str
+    chat_id: int
+    items: List[MediaGroupItem] = Field(min_length=2, max_length=10)
+    topic_id: Optional[int] = None
+    parse_mode: str
+
+
 class SendStickerRequest(BaseModel):
     request_id: str
     chat_id: int
@@ -185,3 +241,9 @@ class MediaFileInfoRequest(BaseModel):
     request_id: str
     chat_id: int
     message_id: int
+
+
+class MediaFileInfoBulkRequest(BaseModel):
+    request_id: str
+    chat_id: int
+    message_ids: List[int]
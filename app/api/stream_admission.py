@@ -0,0 +1,114 @@
+import asyncio
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.config import Config
+
+
+class StreamTicket:
+    def __init__(self, client_key: Optional[str]):
+        self.client_key = client_key
+        self.released = False
+
+
+class StreamAdmission:
+    SLOTS: Optional[asyncio.Semaphore] = None
+    PER_CLIENT: Dict[str, int] = {}
+    ACTIVE = 0
+    QUEUED = 0
+    ADMITTED = 0
+    REJECTED = 0
+    TIMEOUTS = 0
+
+    @classmethod
+    async def slots(cls) -> asyncio.Semaphore:
+        if cls.SLOTS is None:
+            cls.SLOTS = asyncio.Semaphore(Config.STREAM_MAX_ACTIVE)
+
+        return cls.SLOTS
+
+    @staticmethod
+    async def client_key(request: Request) -> Optional[str]:
+        if Config.STREAM_MAX_PER_CLIENT <= 0:
+            return None
+
+        return request.headers.get("X-Client-Id") or None
+
+    @classmethod
+    async def acquire(cls, request: Request) -> Optional[StreamTicket]:
+        client_key = await cls.client_key(request)
+        slots = await cls.slots()
+        if (client_key is not None and cls.PER_CLIENT.get(client_key, 0) >= Config.STREAM_MAX_PER_CLIENT) or (
+                slots.locked() and cls.QUEUED >= Config.STREAM_MAX_QUEUED):
+            cls.REJECTED += 1
+            return None
+
+        if client_key is not None:
+            cls.PER_CLIENT[client_key] = cls.PER_CLIENT.get(client_key, 0) + 1
+
+        cls.QUEUED += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=Config.STREAM_QUEUE_TIMEOUT)
+
+        except asyncio.TimeoutError:
+            cls.TIMEOUTS += 1
+            await cls.forget_client(client_key)
+            return None
+
+        except asyncio.CancelledError:
+            await cls.forget_client(client_key)
+            raise
+
+        finally:
+            cls.QUEUED -= 1
+
+        cls.ACTIVE += 1
+        cls.ADMITTED += 1
+        return StreamTicket(client_key)
+
+    @classmethod
+    async def forget_client(cls, client_key: Optional[str]):
+        if client_key is None:
+            return
+
+        cls.PER_CLIENT[client_key] -= 1
+        if not cls.PER_CLIENT[client_key]:
+            cls.PER_CLIENT.pop(client_key)
+
+    @classmethod
+    async def release(cls, ticket: StreamTicket):
+        if ticket.released:
+            return
+
+        ticket.released = True
+        cls.ACTIVE -= 1
+        (await cls.slots()).release()
+        await cls.forget_client(ticket.client_key)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "active": cls.ACTIVE,
+            "queued": cls.QUEUED,
+            "clients": len(cls.PER_CLIENT),
+            "admitted": cls.ADMITTED,
+            "rejected": cls.REJECTED,
+            "timeouts": cls.TIMEOUTS,
+        }
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    def __init__(self, *args, ticket: StreamTicket, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+
+        finally:
+            await self.body_iterator.aclose()
+            await StreamAdmission.release(self.ticket)
@@ -8,6 +8,7 @@ from telethon.tl.functions.channels import GetFullChannelRequest
 from telethon.tl.functions.messages import GetFullChatRequest
 
 from app.config import Config
+from app.tg.client_pool import ClientPool
 from app.tg.redis_service import RedisInterface
 
 
@@ -51,7 +52,7 @@ class ChatInfo(BaseModel):
                     participants_count = json.loads(chat_data)["member_count"]
 
             if (not participants_count) or (not isinstance(input_obj, types.Channel)):
-                full_chat = await Config.TG_CLIENT(GetFullChannelRequest(input_obj))
+                full_chat = await ClientPool.client()(GetFullChannelRequest(input_obj))
                 input_obj = full_chat.chats[0]
                 participants_count = full_chat.full_chat.participants_count
                 flag_update_cache = True
@@ -63,7 +64,7 @@ class ChatInfo(BaseModel):
         elif isinstance(input_obj, (types.PeerChat, types.InputPeerChat, types.Chat)) or chat:
             participants_count = None
             if not isinstance(input_obj, types.Chat):
-                full_chat = await Config.TG_CLIENT(GetFullChatRequest(getattr(input_obj, "chat_id", input_obj)))
+                full_chat = await ClientPool.client()(GetFullChatRequest(getattr(input_obj, "chat_id", input_obj)))
                 input_obj = full_chat.chats[0]
                 participants_count = len(full_chat.full_chat.participants.participants)
                 flag_update_cache = True
@@ -147,6 +148,7 @@ class MessageCreated(BaseModel):
     chat_info: ChatInfo
     timestamp: str
     media: Union[None, MediaPhoto, MediaSticker, MediaDocument, MediaAudio, MediaVideoGIF]
+    stored_path: Optional[str] = None
 
 
 class MessageEdited(BaseModel):
@@ -160,6 +162,14 @@ class MessageEdited(BaseModel):
     chat_info: ChatInfo
     timestamp: str
     media: Union[None, MediaPhoto, MediaSticker, MediaDocument, MediaAudio, MediaVideoGIF]
+    stored_path: Optional[str] = None
+
+
+class MediaStored(BaseModel):
+    type: str = "media_stored"
+    chat_id: int
+    message_id: int
+    stored_path: str
 
 
 class MessageDeleted(BaseModel):
@@ -222,7 +232,7 @@ class APIInterface:
 
     @staticmethod
     async def send_request(req_model: Union[
-        MessageCreated, MessageEdited, MessageDeleted,
+        MessageCreated, MessageEdited, MessageDeleted, MediaStored,
         TopicCreated, TopicEdited, TopicDeleted,
         BotAdded, BotDeleted
     ], utils_obj):
@@ -238,6 +248,10 @@ class APIInterface:
             url += "/webhook/telegram/update"
             text = "Event: Message Edited"
 
+        elif isinstance(req_model, MediaStored):
+            url += "/webhook/telegram/media_stored"
+            text = "Event: Media Stored"
+
         elif isinstance(req_model, MessageDeleted):
             url += "/webhook/telegram/delete"
             text = "Event: Message Deleted"
@@ -1,7 +1,8 @@
 import os.path
+import socket
 from logging import Logger
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict
 from asyncio import Queue
 
 from aiohttp import ClientSession
@@ -16,10 +17,26 @@ load_dotenv()
 LOG_LIST: List[str] = []
 
 
+def env_mapping(name: str, default: str) -> Dict[str, str]:
+    return {
+        key.strip(): value.strip()
+        for key, value in (item.split(":", 1) for item in os.getenv(name, default).split(",") if item.strip())
+    }
+
+
 class Config:
     TG_API_ID = int(os.getenv("TG_API_ID").strip())
     TG_API_HASH = os.getenv("TG_API_HASH").strip()
     TG_CLIENT: Optional[TelegramClient] = None
+    TG_SESSION_NAME: str = os.getenv("TG_SESSION_NAME", "work-app").strip()
+    TG_POOL_SESSIONS: List[str] = [
+        session.strip() for session in os.getenv("TG_POOL_SESSIONS", "").split(",") if session.strip()
+    ]
+    INBOUND_DEDUP_TTL: float = float(os.getenv("INBOUND_DEDUP_TTL", "60").strip())
+    INBOUND_DEDUP_SIZE: int = int(os.getenv("INBOUND_DEDUP_SIZE", "100000").strip())
+    POOL_OWNER_CACHE_SIZE: int = int(os.getenv("POOL_OWNER_CACHE_SIZE", "100000").strip())
+    POOL_OWNER_TTL: int = int(os.getenv("POOL_OWNER_TTL", "604800").strip())
+    PEER_CACHE_SIZE: int = int(os.getenv("PEER_CACHE_SIZE", "50000").strip())
 
     DATETIME_FORMAT = os.getenv("DATETIME_FORMAT").strip()
     LOGGING_DIR = Path(os.path.abspath("logs"))
@@ -33,6 +50,20 @@ class Config:
     KAFKA_BOOTSTRAP_IP: str = os.getenv("KAFKA_BOOTSTRAP_IP").strip()
     KAFKA_TOPIC_COMMANDS: str = os.getenv("KAFKA_TOPIC_COMMANDS").strip()
     KAFKA_TOPIC_RESPONSES: str = os.getenv("KAFKA_TOPIC_RESPONSES").strip()
+    KAFKA_GROUP_ID: str = os.getenv("KAFKA_GROUP_ID", "demo-group").strip()
+
+    CLUSTER_MODE: bool = bool(int(os.getenv("CLUSTER_MODE", "0").strip()))
+    CLUSTER_MAX_HOPS: int = int(os.getenv("CLUSTER_MAX_HOPS", "3").strip())
+    INSTANCE_ID: str = os.getenv("INSTANCE_ID", "").strip() or f"{socket.gethostname()}-{os.getpid()}"
+    SESSION_LEASE_TTL: float = float(os.getenv("SESSION_LEASE_TTL", "30").strip())
+
+    EVENTS_SINK_DEFAULT: str = os.getenv("EVENTS_SINK_DEFAULT", "webhook").strip()
+    EVENTS_SINK_ROUTES: Dict[str, str] = env_mapping("EVENTS_SINK_ROUTES", "")
+    EVENTS_TOPIC_DEFAULT: str = os.getenv("EVENTS_TOPIC_DEFAULT", "tg-events").strip()
+    EVENTS_TOPICS: Dict[str, str] = env_mapping("EVENTS_TOPICS", "")
+    EVENTS_KAFKA_LINGER_MS: int = int(os.getenv("EVENTS_KAFKA_LINGER_MS", "20").strip())
+    EVENTS_KAFKA_BATCH_SIZE: int = int(os.getenv("EVENTS_KAFKA_BATCH_SIZE", "131072").strip())
+    EVENTS_KAFKA_COMPRESSION: str = os.getenv("EVENTS_KAFKA_COMPRESSION", "gzip").strip()
 
     BASE_URL: str = os.getenv("BASE_URL").strip()
     AIOHTTP_SESSION: Optional[ClientSession] = None
@@ -45,6 +76,93 @@ class Config:
     DEBUG_TIMEZONE = timezone(os.getenv("DEBUG_TIMEZONE").strip())
 
     QUEUE_WORKER: Optional[Queue] = None
+    TG_MAX_IDS_PER_CALL: int = int(os.getenv("TG_MAX_IDS_PER_CALL", "100").strip())
+    TG_MESSAGE_LIMIT: int = int(os.getenv("TG_MESSAGE_LIMIT", "4096").strip())
+
+    SCHED_GLOBAL_RATE: float = float(os.getenv("SCHED_GLOBAL_RATE", "30").strip())
+    SCHED_GLOBAL_BURST: float = float(os.getenv("SCHED_GLOBAL_BURST", "30").strip())
+    SCHED_GROUP_RATE: float = float(os.getenv("SCHED_GROUP_RATE", "0.33").strip())
+    SCHED_GROUP_BURST: float = float(os.getenv("SCHED_GROUP_BURST", "3").strip())
+    SCHED_PRIVATE_RATE: float = float(os.getenv("SCHED_PRIVATE_RATE", "1").strip())
+    SCHED_PRIVATE_BURST: float = float(os.getenv("SCHED_PRIVATE_BURST", "3").strip())
+    SCHED_MAX_CONCURRENT: int = int(os.getenv("SCHED_MAX_CONCURRENT", "8").strip())
+    SCHED_MAX_RETRIES: int = int(os.getenv("SCHED_MAX_RETRIES", "5").strip())
+    SCHED_MAX_IDLE_BUCKETS: int = int(os.getenv("SCHED_MAX_IDLE_BUCKETS", "10000").strip())
+
+    LANE_WEIGHTS: Dict[str, int] = {
+        lane: int(weight) for lane, weight in env_mapping("LANE_WEIGHTS", "high:8,normal:3,low:1").items()
+    }
+    LANE_DEFAULTS: Dict[str, str] = env_mapping(
+        "LANE_DEFAULTS",
+        "send_message:high,edit_message:high,delete_message:high,delete_message_bulk:high,message_pin_bulk:normal,"
+        "send_video:low,send_document:low,send_audio:low,send_media_group:low,media_file_info:low,media_file_info_bulk:low"
+    )
+    LANE_DEFAULT: str = os.getenv("LANE_DEFAULT", "normal").strip()
+    LANE_MAX_WAIT: float = float(os.getenv("LANE_MAX_WAIT", "10").strip())
+
+    DEDUP_TTL: int = int(os.getenv("DEDUP_TTL", "86400").strip())
+    DEDUP_PENDING_TTL: int = int(os.getenv("DEDUP_PENDING_TTL", "60").strip())
+    DEDUP_MEMORY_SIZE: int = int(os.getenv("DEDUP_MEMORY_SIZE", "50000").strip())
+    DEDUP_REQUEST_TYPES: List[str] = [
+        request_type.strip() for request_type in os.getenv(
+            "DEDUP_REQUEST_TYPES",
+            "send_message,send_photo,send_video,send_audio,send_document,send_media_group,send_sticker,send_voice,"
+            "send_gif"
+        ).split(",") if request_type.strip()
+    ]
+
+    MEDIA_REUSE_TTL: int = int(os.getenv("MEDIA_REUSE_TTL", "2592000").strip())
+    MEDIA_REUSE_URL_TTL: int = int(os.getenv("MEDIA_REUSE_URL_TTL", "86400").strip())
+    MEDIA_REUSE_HEAD_TIMEOUT: float = float(os.getenv("MEDIA_REUSE_HEAD_TIMEOUT", "5").strip())
+    MEDIA_REUSE_CACHE_SIZE: int = int(os.getenv("MEDIA_REUSE_CACHE_SIZE", "10000").strip())
+
+    UPLOAD_MAX_CONCURRENT: int = int(os.getenv("UPLOAD_MAX_CONCURRENT", "4").strip())
+    UPLOAD_BUFFER_PARTS: int = int(os.getenv("UPLOAD_BUFFER_PARTS", "8").strip())
+    UPLOAD_PARALLELISM: int = int(os.getenv("UPLOAD_PARALLELISM", "4").strip())
+    UPLOAD_PART_RETRIES: int = int(os.getenv("UPLOAD_PART_RETRIES", "3").strip())
+    UPLOAD_FLOOD_SLEEP_THRESHOLD: int = int(os.getenv("UPLOAD_FLOOD_SLEEP_THRESHOLD", "60").strip())
+    UPLOAD_URL_MIN_SIZE: int = int(os.getenv("UPLOAD_URL_MIN_SIZE", "20971520").strip())
+
+    STREAM_WORKERS: int = int(os.getenv("STREAM_WORKERS", "0").strip())
+    STREAM_WORKERS_HOST: str = os.getenv("STREAM_WORKERS_HOST", "127.0.0.1").strip()
+    STREAM_WORKERS_PORT: int = int(os.getenv("STREAM_WORKERS_PORT", "8002").strip())
+    STREAM_MAX_ACTIVE: int = int(os.getenv("STREAM_MAX_ACTIVE", "64").strip())
+    STREAM_MAX_PER_CLIENT: int = int(os.getenv("STREAM_MAX_PER_CLIENT", "0").strip())
+    STREAM_MAX_QUEUED: int = int(os.getenv("STREAM_MAX_QUEUED", "32").strip())
+    STREAM_QUEUE_TIMEOUT: float = float(os.getenv("STREAM_QUEUE_TIMEOUT", "5").strip())
+    STREAM_RETRY_AFTER: int = int(os.getenv("STREAM_RETRY_AFTER", "5").strip())
+    STREAM_PREFETCH_CHUNKS: int = int(os.getenv("STREAM_PREFETCH_CHUNKS", "4").strip())
+    STREAM_MAX_INFLIGHT: int = int(os.getenv("STREAM_MAX_INFLIGHT", "32").strip())
+    STREAM_CHUNK_RETRIES: int = int(os.getenv("STREAM_CHUNK_RETRIES", "3").strip())
+    STREAM_SHARED_WINDOW: int = int(os.getenv("STREAM_SHARED_WINDOW", "16").strip())
+    STREAM_DESCRIPTOR_CACHE_SIZE: int = int(os.getenv("STREAM_DESCRIPTOR_CACHE_SIZE", "10000").strip())
+    STREAM_DESCRIPTOR_TTL: int = int(os.getenv("STREAM_DESCRIPTOR_TTL", "3600").strip())
+    STREAM_CACHE_DIR = Path(os.path.abspath(os.getenv("STREAM_CACHE_DIR", "cache/chunks").strip()))
+    STREAM_CACHE_MAX_BYTES: int = int(os.getenv("STREAM_CACHE_MAX_BYTES", "2147483648").strip())
+
+    MEDIA_STORE_CHATS: List[int] = [
+        int(chat_id) for chat_id in os.getenv("MEDIA_STORE_CHATS", "").split(",") if chat_id.strip()
+    ]
+    MEDIA_STORE_TYPES: List[str] = [
+        type_name.strip() for type_name in os.getenv(
+            "MEDIA_STORE_TYPES", "photo,video,document,audio,voice,gif,sticker"
+        ).split(",") if type_name.strip()
+    ]
+    MEDIA_STORE_DIR = Path(os.path.abspath(os.getenv("MEDIA_STORE_DIR", "storage/media").strip()))
+    MEDIA_STORE_CONCURRENCY: int = int(os.getenv("MEDIA_STORE_CONCURRENCY", "3").strip())
+    MEDIA_STORE_MAX_PENDING: int = int(os.getenv("MEDIA_STORE_MAX_PENDING", "1000").strip())
+    MEDIA_STORE_INDEX_SIZE: int = int(os.getenv("MEDIA_STORE_INDEX_SIZE", "100000").strip())
+
+    THUMB_MAX_SIDE: int = int(os.getenv("THUMB_MAX_SIDE", "320").strip())
+    THUMB_CACHE_DIR = Path(os.path.abspath(os.getenv("THUMB_CACHE_DIR", "cache/thumbs").strip()))
+    THUMB_MEMORY_CACHE_SIZE: int = int(os.getenv("THUMB_MEMORY_CACHE_SIZE", "5000").strip())
+    THUMB_CACHE_MAX_BYTES: int = int(os.getenv("THUMB_CACHE_MAX_BYTES", "268435456").strip())
+
+    MEDIA_INFO_BATCH_WINDOW: float = float(os.getenv("MEDIA_INFO_BATCH_WINDOW", "0.2").strip())
+    MEDIA_INFO_CACHE_SIZE: int = int(os.getenv("MEDIA_INFO_CACHE_SIZE", "10000").strip())
+
+    EDIT_COALESCE_WINDOW: float = float(os.getenv("EDIT_COALESCE_WINDOW", "0.5").strip())
+    INBOUND_EDIT_DEBOUNCE_WINDOW: float = float(os.getenv("INBOUND_EDIT_DEBOUNCE_WINDOW", "2").strip())
 
     REST_APP: Optional[FastAPI] = None
     UVICORN_HOST: str = os.getenv("UVICORN_HOST").strip()
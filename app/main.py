@@ -6,12 +6,19 @@ from datetime import datetime
 import uvicorn
 from aiohttp import ClientSession
 from fastapi import FastAPI
-from telethon import events
 
+from app.api.events_sink import EventsSink, KafkaEventsSink
 from app.api.kafka import KafkaInterface
 from app.config import Config
+from app.stream_workers import StreamWorkers
+from app.tg.chunk_cache import ChunkCache
+from app.tg.client_pool import ClientPool
 from app.tg.events_catcher import EventsCatcher
 from app.tg.redis_service import RedisInterface
+from app.tg.scheduler import ActionScheduler
+from app.tg.session_lease import SessionLease
+from app.tg.thumbnails import ThumbnailService
+from app.tg.uploader import MediaUploader
 from app.utils import Utils as Ut
 
 
@@ -44,34 +51,51 @@ async def lifespan(app: FastAPI):
     loop = asyncio.get_event_loop()
     loop.create_task(Ut.logging_queue())
 
+    if not await RedisInterface().init_redis():
+        sys.exit(1)
+
+    await Ut.log("Redis has been initialized!")
+
+    if Config.CLUSTER_MODE:
+        await SessionLease.wait_acquire(Config.TG_SESSION_NAME)
+        await SessionLease.keep(Config.TG_SESSION_NAME)
+
     if not await Ut.init_telegram_client():
         sys.exit(1)
 
     await Ut.log("Client has been connected!")
 
-    if not await RedisInterface().init_redis():
-        sys.exit(1)
+    if Config.CLUSTER_MODE:
+        await SessionLease.attach(Config.TG_SESSION_NAME, Config.TG_CLIENT)
 
-    await Ut.log("Redis has been initialized!")
     await RedisInterface().load_messages_from_groups()
 
     asyncio.create_task(worker())
+    await ActionScheduler.init_scheduler()
+    await ChunkCache.init_cache()
+    await ThumbnailService.init_cache()
 
     if (not await KafkaInterface().init_consumer()) or (not await KafkaInterface().init_producer()):
         return
 
-    asyncio.create_task(KafkaInterface().start_polling())
+    if await EventsSink.uses_kafka() and not await KafkaEventsSink.init_producer():
+        return
 
-    Config.TG_CLIENT.add_event_handler(EventsCatcher.event_new_message, events.NewMessage())
-    Config.TG_CLIENT.add_event_handler(EventsCatcher.event_message_edited, events.MessageEdited())
-    Config.TG_CLIENT.add_event_handler(EventsCatcher.event_message_deleted, events.MessageDeleted())
-    Config.TG_CLIENT.add_event_handler(EventsCatcher.event_chat_action, events.ChatAction())
-    Config.TG_CLIENT.add_event_handler(EventsCatcher.event_raw, events.Raw())
+    await ClientPool.init_pool(register_handlers=EventsCatcher.register_handlers)
     await Ut.log("Event handlers has been registered!")
 
+    asyncio.create_task(KafkaInterface().start_polling())
+
+    await StreamWorkers.start(datetime_of_start)
+
     yield
 
+    await StreamWorkers.stop()
+    await MediaUploader.disconnect()
+    await ClientPool.disconnect()
     await Config.TG_CLIENT.disconnect()
+    await SessionLease.release_all()
+    await KafkaEventsSink.stop()
     await Config.AIOHTTP_SESSION.close()
 
 
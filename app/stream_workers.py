@@ -0,0 +1,154 @@
+import asyncio
+import multiprocessing
+import socket
+import sys
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Dict, Optional
+
+import uvicorn
+from aiohttp import ClientSession
+from fastapi import FastAPI
+from telethon import TelegramClient
+from telethon.sessions import StringSession
+
+from app.config import Config
+from app.tg.chunk_cache import ChunkCache
+from app.tg.redis_service import RedisInterface
+from app.tg.thumbnails import ThumbnailService
+from app.utils import Utils as Ut
+
+
+@asynccontextmanager
+async def worker_lifespan(app: FastAPI, worker_id: int, datetime_of_start: str, session_string: str):
+    Config.LOGGER = await Ut.add_logging(datetime_of_start=datetime_of_start, process_id=worker_id)
+    Config.AIOHTTP_SESSION = ClientSession()
+
+    loop = asyncio.get_event_loop()
+    loop.create_task(Ut.logging_queue())
+
+    if not await RedisInterface().init_redis():
+        sys.exit(1)
+
+    Config.TG_CLIENT = TelegramClient(
+        session=StringSession(session_string), api_id=Config.TG_API_ID, api_hash=Config.TG_API_HASH,
+        receive_updates=False, flood_sleep_threshold=0
+    )
+    await Config.TG_CLIENT.connect()
+    if not await Config.TG_CLIENT.is_user_authorized():
+        Config.LOGGER.critical(f"Stream worker {worker_id} | The copied session is not authorized!")
+        sys.exit(1)
+
+    Config.STREAM_CACHE_DIR = Config.STREAM_CACHE_DIR.with_name(f"{Config.STREAM_CACHE_DIR.name}-worker-{worker_id}")
+    Config.THUMB_CACHE_DIR = Config.THUMB_CACHE_DIR.with_name(f"{Config.THUMB_CACHE_DIR.name}-worker-{worker_id}")
+    Config.STREAM_CACHE_MAX_BYTES //= Config.STREAM_WORKERS
+    Config.THUMB_CACHE_MAX_BYTES //= Config.STREAM_WORKERS
+    Config.STREAM_MAX_ACTIVE = max(Config.STREAM_MAX_ACTIVE // Config.STREAM_WORKERS, 1)
+    Config.STREAM_MAX_QUEUED = max(Config.STREAM_MAX_QUEUED // Config.STREAM_WORKERS, 1)
+    Config.STREAM_MAX_INFLIGHT = max(Config.STREAM_MAX_INFLIGHT // Config.STREAM_WORKERS, 1)
+    await ChunkCache.init_cache()
+    await ThumbnailService.init_cache()
+    await Ut.log(f"Stream worker {worker_id} has been started!")
+
+    yield
+
+    await Config.TG_CLIENT.disconnect()
+    await Config.AIOHTTP_SESSION.close()
+
+
+def run_worker(sock: socket.socket, worker_id: int, datetime_of_start: str, session_string: str):
+    Config.REST_APP = FastAPI(lifespan=partial(
+        worker_lifespan, worker_id=worker_id, datetime_of_start=datetime_of_start, session_string=session_string))
+    from app.api import endpoints
+
+    server = uvicorn.Server(uvicorn.Config(Config.REST_APP))
+    asyncio.run(server.serve(sockets=[sock]))
+
+
+class StreamWorkers:
+    PROCESSES: Dict[int, multiprocessing.Process] = {}
+    SOCKET: socket.socket = None
+    MONITOR: Optional[asyncio.Task] = None
+    DATETIME_OF_START = ""
+    CHECK_INTERVAL = 5
+    RESTARTS = 0
+
+    @classmethod
+    async def spawn(cls, worker_id: int):
+        session_string = StringSession.save(Config.TG_CLIENT.session)
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_worker, args=(cls.SOCKET, worker_id, cls.DATETIME_OF_START, session_string),
+            name=f"stream-worker-{worker_id}", daemon=True
+        )
+        process.start()
+        cls.PROCESSES[worker_id] = process
+
+    @classmethod
+    async def start(cls, datetime_of_start: str):
+        if Config.STREAM_WORKERS <= 0:
+            return
+
+        cls.SOCKET = socket.create_server((Config.STREAM_WORKERS_HOST, Config.STREAM_WORKERS_PORT), backlog=2048)
+        cls.DATETIME_OF_START = datetime_of_start
+        for worker_id in range(1, Config.STREAM_WORKERS + 1):
+            await cls.spawn(worker_id)
+
+        cls.MONITOR = asyncio.create_task(cls.monitor())
+        await Ut.log(
+            f"Started {Config.STREAM_WORKERS} stream workers on "
+            f"{Config.STREAM_WORKERS_HOST}:{Config.STREAM_WORKERS_PORT}")
+
+    @classmethod
+    async def monitor(cls):
+        while True:
+            await asyncio.sleep(cls.CHECK_INTERVAL)
+            if not Config.TG_CLIENT.is_connected():
+                if cls.PROCESSES:
+                    Config.LOGGER.warning("StreamWorkers | The main client is disconnected, stopping stream workers")
+                    await cls.terminate()
+
+                continue
+
+            for worker_id in range(1, Config.STREAM_WORKERS + 1):
+                process = cls.PROCESSES.get(worker_id)
+                if process is not None and process.is_alive():
+                    continue
+
+                if process is not None:
+                    cls.RESTARTS += 1
+                    Config.LOGGER.warning(
+                        f"StreamWorkers | Stream worker {worker_id} exited with code {process.exitcode}, restarting")
+
+                try:
+                    await cls.spawn(worker_id)
+
+                except Exception as ex:
+                    Config.LOGGER.error(f"StreamWorkers | Unable to start stream worker {worker_id}! ex: {ex}")
+
+    @classmethod
+    async def terminate(cls):
+        for process in cls.PROCESSES.values():
+            process.terminate()
+
+        for process in cls.PROCESSES.values():
+            await asyncio.to_thread(process.join, 10)
+
+        cls.PROCESSES.clear()
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "alive": sum(process.is_alive() for process in cls.PROCESSES.values()),
+            "restarts": cls.RESTARTS,
+        }
+
+    @classmethod
+    async def stop(cls):
+        if cls.MONITOR is not None:
+            cls.MONITOR.cancel()
+            cls.MONITOR = None
+
+        await cls.terminate()
+        if cls.SOCKET is not None:
+            cls.SOCKET.close()
+            cls.SOCKET = None
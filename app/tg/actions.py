@@ -1,12 +1,24 @@
-from typing import Union
-
-from telethon.errors import MessageAuthorRequiredError, MessageNotModifiedError, BadRequestError
+import asyncio
+import os
+from typing import Union, List, Dict, Optional
+
+from telethon.errors import (
+    MessageAuthorRequiredError, MessageNotModifiedError, BadRequestError, FloodWaitError, SlowModeWaitError,
+    FileReferenceExpiredError, FileReferenceInvalidError, MediaEmptyError
+)
+from telethon import helpers, utils
 from telethon.tl.functions.messages import CreateForumTopicRequest, EditForumTopicRequest, DeleteTopicHistoryRequest
 from telethon.tl import types as tt
 
 from app.api.kafka import *
 from app.api.kafka_models import MediaFileInfoRequest
 from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.media_cache import MediaReuseCache
+from app.tg.peer_resolver import PeerResolver
+from app.tg.scheduler import ActionProgress
+from app.tg.tg_tools import TgTools
+from app.tg.uploader import MediaUploader
 from app.utils import Utils as Ut
 
 
@@ -14,41 +26,230 @@ class UserActions:
 
     @staticmethod
     async def get_peer_from_id(chat_id: Union[str, int]):
-        chat_id = str(chat_id)
-        if chat_id.startswith("-100"):
-            return tt.PeerChannel(channel_id=int(chat_id[4:]))
+        return await PeerResolver.get_input_peer(chat_id, session=ClientPool.session_name())
+
+    @staticmethod
+    async def chunk_ids(message_ids: List[int]) -> List[List[int]]:
+        size = Config.TG_MAX_IDS_PER_CALL
+        return [message_ids[i:i + size] for i in range(0, len(message_ids), size)]
+
+    @staticmethod
+    async def bulk_status(results: List[Union[BulkItemResult, MediaFileInfoItem]]) -> str:
+        succeeded = sum(1 for r in results if r.status == Ut.STATUS_SUCCESS)
+        if succeeded == len(results):
+            return Ut.STATUS_SUCCESS
+
+        return Ut.STATUS_PARTIAL if succeeded else Ut.STATUS_FAIL
+
+    @staticmethod
+    async def delete_messages_by_ids(
+            chat_id: int, message_ids: List[int], results: Optional[List[BulkItemResult]] = None
+    ) -> List[BulkItemResult]:
+        client = ClientPool.client()
+        entity = await UserActions.get_peer_from_id(chat_id)
+
+        results = [] if results is None else results
+        done = {r.message_id for r in results}
+        for chunk in await UserActions.chunk_ids([msg_id for msg_id in message_ids if msg_id not in done]):
+            try:
+                result = await client.delete_messages(entity=entity, message_ids=chunk)
+                print(f"result delete_messages = {result}")
+
+                not_deleted = set()
+                if sum(affected.pts_count for affected in result) < len(chunk):
+                    remaining = await client.get_messages(entity, ids=chunk)
+                    not_deleted = {msg.id for msg in remaining if msg is not None}
+
+                results.extend(
+                    BulkItemResult(message_id=msg_id, status=Ut.STATUS_FAIL, error="Message was not deleted")
+                    if msg_id in not_deleted else BulkItemResult(message_id=msg_id, status=Ut.STATUS_SUCCESS)
+                    for msg_id in chunk
+                )
+
+            except (FloodWaitError, SlowModeWaitError):
+                raise
+
+            except Exception as ex:
+                results.extend(
+                    BulkItemResult(message_id=msg_id, status=Ut.STATUS_FAIL, error=str(ex)) for msg_id in chunk)
+
+        return results
+
+    @staticmethod
+    async def pin_messages_by_ids(
+            chat_id: int, message_ids: List[int], results: Optional[List[BulkItemResult]] = None
+    ) -> List[BulkItemResult]:
+        entity = await UserActions.get_peer_from_id(chat_id)
+
+        results = [] if results is None else results
+        done = {r.message_id for r in results}
+        for msg_id in message_ids:
+            if msg_id in done:
+                continue
+
+            try:
+                result = await ClientPool.client().pin_message(entity=entity, message=msg_id)
+                print(f"result message_pin = {result}")
+                results.append(BulkItemResult(message_id=msg_id, status=Ut.STATUS_SUCCESS))
+
+            except (FloodWaitError, SlowModeWaitError):
+                raise
+
+            except Exception as ex:
+                results.append(BulkItemResult(message_id=msg_id, status=Ut.STATUS_FAIL, error=str(ex)))
+
+        return results
+
+    @staticmethod
+    async def get_messages_by_ids(chat_id: int, message_ids: List[int]) -> Dict[int, Optional[tt.Message]]:
+        entity = await UserActions.get_peer_from_id(chat_id)
+
+        messages = {}
+        for chunk in await UserActions.chunk_ids(message_ids):
+            result = await ClientPool.client().get_messages(entity, ids=chunk)
+            for msg_id, msg in zip(chunk, result):
+                messages[msg_id] = msg
+
+        return messages
+
+    @staticmethod
+    async def send_file_cached(chat_id: int, file: str, **kwargs):
+        client = ClientPool.client()
+        entity = await UserActions.get_peer_from_id(chat_id)
+
+        record, probe = await MediaReuseCache.lookup(file)
+        if record is not None:
+            try:
+                return await client.send_file(entity=entity, file=await MediaReuseCache.input_media(record), **kwargs)
+
+            except (FileReferenceExpiredError, FileReferenceInvalidError):
+                record = await MediaReuseCache.refresh(file, record)
+                if record is not None:
+                    return await client.send_file(
+                        entity=entity, file=await MediaReuseCache.input_media(record), **kwargs)
+
+            except MediaEmptyError:
+                await MediaReuseCache.invalidate(file, record)
+
+        upload = file
+        if await MediaUploader.is_url(file):
+            uploaded = await MediaUploader.upload_url(client, file)
+            if uploaded is not None:
+                upload, mime_type = uploaded
+                kwargs.setdefault("mime_type", mime_type)
+
+        elif await MediaUploader.is_big_local_file(file):
+            upload = await MediaUploader.upload_path(client, file)
+
+        result = await client.send_file(entity=entity, file=upload, **kwargs)
+        await MediaReuseCache.store(file, result, **probe)
+        return result
+
+    @staticmethod
+    async def upload_album_item(file: str, use_cache: bool = True):
+        probe = {}
+        if use_cache:
+            record, probe = await MediaReuseCache.lookup(file)
+            if record is not None:
+                return await MediaReuseCache.input_media(record), probe
+
+        if await MediaUploader.is_url(file):
+            uploaded = await MediaUploader.upload_url(ClientPool.client(), file)
+            return uploaded[0] if uploaded is not None else file, probe
 
-        elif chat_id.startswith("-"):
-            return tt.PeerChat(chat_id=int(chat_id[1:]))
+        if os.path.isfile(file):
+            return await MediaUploader.upload_path(ClientPool.client(), file), probe
 
-        else:
-            return tt.PeerUser(user_id=int(chat_id))
+        return file, probe
+
+    @staticmethod
+    async def send_album(payload: SendMediaGroupRequest, use_cache: bool = True) -> List[tt.Message]:
+        files = [item.file for item in payload.items]
+        uploads = await asyncio.gather(*[UserActions.upload_album_item(file, use_cache) for file in files])
+        results = await ClientPool.client().send_file(
+            entity=await UserActions.get_peer_from_id(payload.chat_id),
+            file=[upload for upload, _ in uploads],
+            caption=[item.caption or "" for item in payload.items],
+            reply_to=payload.topic_id,
+            parse_mode=payload.parse_mode
+        )
+        for file, (_, probe), result in zip(files, uploads, results):
+            await MediaReuseCache.store(file, result, **probe)
+
+        return results
 
     @staticmethod
     async def send_message(payload: SendMessageRequest):
         try:
-            result = await Config.TG_CLIENT.send_message(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
-                message=payload.text,
-                parse_mode=payload.parse_mode,
-                silent=payload.disable_notification,
-                reply_to=payload.topic_id if payload.topic_id else payload.reply_to_message_id
-            )
-            print(f"result send_message = {result}")
+            parser = utils.sanitize_parse_mode(payload.parse_mode)
+            text, entities = parser.parse(payload.text) if parser else (payload.text, [])
+            if len(helpers.add_surrogate(text)) <= Config.TG_MESSAGE_LIMIT:
+                result = await ClientPool.client().send_message(
+                    entity=await UserActions.get_peer_from_id(payload.chat_id),
+                    message=payload.text,
+                    parse_mode=payload.parse_mode,
+                    silent=payload.disable_notification,
+                    reply_to=payload.topic_id if payload.topic_id else payload.reply_to_message_id
+                )
+                print(f"result send_message = {result}")
+                return [result.id]
+
+            return await UserActions.send_message_parts(payload, text, entities)
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_message | The action failed to complete. ex: {ex}")
 
+    @staticmethod
+    async def send_message_parts(payload: SendMessageRequest, text: str, entities: List) -> Optional[List[int]]:
+        parts = list(utils.split_text(text, entities, limit=Config.TG_MESSAGE_LIMIT))
+        message_ids = await ActionProgress.get(payload.request_id)
+        reply_to = payload.topic_id if payload.topic_id else payload.reply_to_message_id
+
+        response = ActionResponse(status=Ut.STATUS_FAIL, request_id=payload.request_id)
+        try:
+            for part_text, part_entities in parts[len(message_ids):]:
+                result = await ClientPool.client().send_message(
+                    entity=await UserActions.get_peer_from_id(payload.chat_id),
+                    message=part_text,
+                    formatting_entities=part_entities,
+                    silent=payload.disable_notification,
+                    reply_to=message_ids[-1] if message_ids else reply_to
+                )
+                message_ids.append(result.id)
+
+            print(f"result send_message = {message_ids} ({len(parts)} parts)")
+            response.status = Ut.STATUS_SUCCESS
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
+        except Exception as ex:
+            Config.LOGGER.error(
+                f"Act send_message | Part {len(message_ids) + 1}/{len(parts)} failed to send. ex: {ex}")
+            if message_ids:
+                response.status = Ut.STATUS_PARTIAL
+
+        response.message_ids = list(message_ids)
+        result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+            payload=response, topic=Config.KAFKA_TOPIC_RESPONSES, request_type="send_message")
+        print(f"response kafka msg = {result}")
+
+        return response.message_ids or None
+
     @staticmethod
     async def edit_message(payload: EditMessageRequest):
         try:
-            result = await Config.TG_CLIENT.edit_message(
+            result = await ClientPool.client().edit_message(
                 entity=await UserActions.get_peer_from_id(payload.chat_id),
                 message=payload.message_id,
                 text=payload.text,
                 parse_mode=payload.parse_mode
             )
             print(f"result edit_message = {result}")
+            return [result.id]
 
         except MessageAuthorRequiredError:
             Config.LOGGER.error("Act edit_message | Не удалось отредактировать сообщение! Бот не отправитель")
@@ -56,56 +257,90 @@ class UserActions:
         except MessageNotModifiedError:
             Config.LOGGER.error("Act edit_message | Не удалось отредактировать сообщение! Присланное содержимое не изменилось")
 
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
         except Exception as ex:
             Config.LOGGER.error(f"Act edit_message | The action failed to complete. ex: {ex}")
 
     @staticmethod
     async def delete_message(payload: DeleteMessageRequest):
+        results = await UserActions.delete_messages_by_ids(payload.chat_id, [payload.message_id])
+        if results[0].status != Ut.STATUS_SUCCESS:
+            Config.LOGGER.error(f"Act delete_message | The action failed to complete. ex: {results[0].error}")
+
+    @staticmethod
+    async def delete_message_bulk(payload: DeleteMessageBulkRequest):
         try:
-            result = await Config.TG_CLIENT.delete_messages(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
-                message_ids=payload.message_id
-            )
-            print(f"result delete_message = {result}")
+            results = await UserActions.delete_messages_by_ids(
+                payload.chat_id, payload.message_ids, await ActionProgress.get(payload.request_id))
+            response = BulkActionResponse(
+                status=await UserActions.bulk_status(results), request_id=payload.request_id, results=results)
+
+            result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+                payload=response, topic=Config.KAFKA_TOPIC_RESPONSES, request_type="delete_message_bulk")
+            print(f"response kafka msg = {result}")
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
-            Config.LOGGER.error(f"Act delete_message | The action failed to complete. ex: {ex}")
+            Config.LOGGER.error(f"Act delete_message_bulk | The action failed to complete. ex: {ex}")
 
     @staticmethod
     async def message_pin(payload: MessagePinRequest):
+        results = await UserActions.pin_messages_by_ids(payload.chat_id, [payload.message_id])
+        if results[0].status != Ut.STATUS_SUCCESS:
+            Config.LOGGER.error(f"Act message_pin | The action failed to complete. ex: {results[0].error}")
+
+    @staticmethod
+    async def message_pin_bulk(payload: MessagePinBulkRequest):
         try:
-            result = await Config.TG_CLIENT.pin_message(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
-                message=payload.message_id
-            )
-            print(f"result message_pin = {result}")
+            results = await UserActions.pin_messages_by_ids(
+                payload.chat_id, payload.message_ids, await ActionProgress.get(payload.request_id))
+            response = BulkActionResponse(
+                status=await UserActions.bulk_status(results), request_id=payload.request_id, results=results)
+
+            result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+                payload=response, topic=Config.KAFKA_TOPIC_RESPONSES, request_type="message_pin_bulk")
+            print(f"response kafka msg = {result}")
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
-            Config.LOGGER.error(f"Act message_pin | The action failed to complete. ex: {ex}")
+            Config.LOGGER.error(f"Act message_pin_bulk | The action failed to complete. ex: {ex}")
 
     @staticmethod
     async def message_unpin(payload: MessageUnpinRequest):
         try:
-            result = await Config.TG_CLIENT.unpin_message(
+            result = await ClientPool.client().unpin_message(
                 entity=await UserActions.get_peer_from_id(payload.chat_id),
                 message=payload.message_id
             )
             print(f"result message_unpin = {result}")
 
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
         except Exception as ex:
             Config.LOGGER.error(f"Act message_unpin | The action failed to complete. ex: {ex}")
 
     @staticmethod
     async def send_photo(payload: SendPhotoRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.photo,
                 caption=payload.caption,
                 reply_to=payload.topic_id,
                 parse_mode=payload.parse_mode
             )
             print(f"result send_photo = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_photo | The action failed to complete. ex: {ex}")
@@ -113,14 +348,18 @@ class UserActions:
     @staticmethod
     async def send_video(payload: SendVideoRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.video,
                 caption=payload.caption,
                 reply_to=payload.topic_id,
                 parse_mode=payload.parse_mode
             )
             print(f"result send_photo = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_video | The action failed to complete. ex: {ex}")
@@ -128,14 +367,18 @@ class UserActions:
     @staticmethod
     async def send_audio(payload: SendAudioRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.audio,
                 caption=payload.caption,
                 reply_to=payload.topic_id,
                 parse_mode=payload.parse_mode
             )
             print(f"result send_photo = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_audio | The action failed to complete. ex: {ex}")
@@ -143,27 +386,65 @@ class UserActions:
     @staticmethod
     async def send_document(payload: SendDocumentRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.document,
                 caption=payload.caption,
                 reply_to=payload.topic_id,
                 parse_mode=payload.parse_mode
             )
             print(f"result send_photo = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_document | The action failed to complete. ex: {ex}")
 
+    @staticmethod
+    async def send_media_group(payload: SendMediaGroupRequest):
+        response = ActionResponse(status=Ut.STATUS_FAIL, request_id=payload.request_id)
+        try:
+            try:
+                results = await UserActions.send_album(payload)
+
+            except (FileReferenceExpiredError, FileReferenceInvalidError, MediaEmptyError):
+                for item in payload.items:
+                    await MediaReuseCache.invalidate(item.file)
+
+                results = await UserActions.send_album(payload, use_cache=False)
+
+            print(f"result send_media_group = {results}")
+            response.status = Ut.STATUS_SUCCESS
+            response.message_ids = [result.id for result in results]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
+        except Exception as ex:
+            Config.LOGGER.error(f"Act send_media_group | The action failed to complete. ex: {ex}")
+
+        result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+            payload=response, topic=Config.KAFKA_TOPIC_RESPONSES, request_type="send_media_group")
+        print(f"response kafka msg = {result}")
+
+        if response.status == Ut.STATUS_SUCCESS:
+            return response.message_ids
+
     @staticmethod
     async def send_sticker(payload: SendStickerRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.sticker,
                 reply_to=payload.topic_id
             )
             print(f"result send_sticker = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_sticker | The action failed to complete. ex: {ex}")
@@ -171,14 +452,18 @@ class UserActions:
     @staticmethod
     async def send_voice(payload: SendVoiceRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.voice,
                 caption=payload.caption,
                 reply_to=payload.topic_id,
                 voice_note=True
             )
             print(f"result send_voice = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_voice | The action failed to complete. ex: {ex}")
@@ -186,8 +471,8 @@ class UserActions:
     @staticmethod
     async def send_gif(payload: SendGIFRequest):
         try:
-            result = await Config.TG_CLIENT.send_file(
-                entity=await UserActions.get_peer_from_id(payload.chat_id),
+            result = await UserActions.send_file_cached(
+                chat_id=payload.chat_id,
                 file=payload.gif,
                 caption=payload.caption,
                 parse_mode=payload.parse_mode,
@@ -195,6 +480,10 @@ class UserActions:
                 video_note=False
             )
             print(f"result send_gif = {result}")
+            return [result.id]
+
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
         except Exception as ex:
             Config.LOGGER.error(f"Act send_gif | The action failed to complete. ex: {ex}")
@@ -202,20 +491,23 @@ class UserActions:
     @staticmethod
     async def create_topic(payload: CreateTopicRequest):
         try:
-            result = await Config.TG_CLIENT(CreateForumTopicRequest(
+            result = await ClientPool.client()(CreateForumTopicRequest(
                 peer=await UserActions.get_peer_from_id(payload.chat_id),
                 title=payload.title,
                 icon_color=payload.icon_color
             ))
             print(f"result create_topic = {result}")
 
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
         except Exception as ex:
             Config.LOGGER.error(f"Act create_topic | The action failed to complete. ex: {ex}")
 
     @staticmethod
     async def edit_topic(payload: EditTopicRequest):
         try:
-            result = await Config.TG_CLIENT(EditForumTopicRequest(
+            result = await ClientPool.client()(EditForumTopicRequest(
                 peer=await UserActions.get_peer_from_id(payload.chat_id),
                 topic_id=payload.topic_id,
                 title=payload.title
@@ -225,86 +517,84 @@ class UserActions:
         except BadRequestError as ex:
             Config.LOGGER.error(f"Act edit_topic | Не удалось отредактировать топик! ex: {ex}")
 
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
         except Exception as ex:
             Config.LOGGER.error(f"Act edit_topic | The action failed to complete. ex: {ex}")
 
     @staticmethod
     async def delete_topic(payload: DeleteTopicRequest):
         try:
-            result = await Config.TG_CLIENT(DeleteTopicHistoryRequest(
+            result = await ClientPool.client()(DeleteTopicHistoryRequest(
                 peer=await UserActions.get_peer_from_id(payload.chat_id),
                 top_msg_id=payload.topic_id
             ))
             print(f"result delete_topic = {result}")
 
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
         except Exception as ex:
             Config.LOGGER.error(f"Act delete_topic | The action failed to complete. ex: {ex}")
 
     @staticmethod
-    async def get_media_file_info(payload: MediaFileInfoRequest):
+    async def get_media_file_info(*payloads: MediaFileInfoRequest):
         try:
-            entity = await Config.TG_CLIENT.get_entity(payload.chat_id)
-            msg = await Config.TG_CLIENT.get_messages(entity, ids=payload.message_id)
-            if not msg or not msg.media:
-                Config.LOGGER.error(f"Не нашел медиа по chat_id={payload.chat_id}; msg_id={payload.message_id}!")
-                return
-
-            if isinstance(msg.media, tt.MessageMediaPhoto):
-                largest_size = msg.media.photo.sizes[-1]
-                info_obj = MediaFileInfoResponse(
-                    status=Ut.STATUS_SUCCESS,
-                    request_id=payload.request_id,
-                    media_info=MediaFileInfo(
-                        file_type="photo",
-                        file_name=None,
-                        mime_type="image/jpeg",
-                        file_size=getattr(largest_size, "size", 0),
-                        width=largest_size.w if hasattr(largest_size, "w") else None,
-                        height=largest_size.h if hasattr(largest_size, "h") else None,
-                        created_at=msg.date.isoformat()
-                    )
-                )
+            messages = await UserActions.get_messages_by_ids(
+                payloads[0].chat_id, list(dict.fromkeys(payload.message_id for payload in payloads)))
 
-            elif isinstance(msg.media, tt.MessageMediaDocument):
-                result = {
-                    "file_type": "document"
-                }
-                for attr in msg.media.document.attributes:
-                    if isinstance(attr, tt.DocumentAttributeFilename):
-                        result["file_name"] = attr.file_name
+        except (FloodWaitError, SlowModeWaitError):
+            raise
 
-                    elif isinstance(attr, tt.DocumentAttributeVideo):
-                        result["file_type"] = "video"
-                        result["width"] = attr.w
-                        result["height"] = attr.h
-
-                    elif isinstance(attr, tt.DocumentAttributeAudio):
-                        result["file_type"] = "voice" if attr.voice else "audio"
-
-                    elif isinstance(attr, tt.DocumentAttributeSticker):
-                        result["file_type"] = "sticker"
+        except Exception as ex:
+            Config.LOGGER.error(f"Act get_media_file_info | The action failed to complete. ex: {ex}")
+            return
 
-                    elif isinstance(attr, tt.DocumentAttributeImageSize):
-                        result["width"] = attr.w
-                        result["height"] = attr.h
+        for payload in payloads:
+            try:
+                msg = messages.get(payload.message_id)
+                if not msg or not msg.media:
+                    Config.LOGGER.error(f"Не нашел медиа по chat_id={payload.chat_id}; msg_id={payload.message_id}!")
+                    continue
 
+                media_info = await TgTools.get_media_file_info(msg)
                 info_obj = MediaFileInfoResponse(
-                    status=Ut.STATUS_SUCCESS,
+                    status=Ut.STATUS_SUCCESS if media_info else Ut.STATUS_FAIL,
                     request_id=payload.request_id,
-                    media_info=MediaFileInfo(
-                        mime_type=msg.media.document.mime_type,
-                        file_size=msg.media.document.size,
-                        created_at=msg.date.isoformat(),
-                        **result
-                    )
+                    media_info=media_info
                 )
 
-            else:
-                info_obj = MediaFileInfoResponse(status=Ut.STATUS_FAIL, request_id=payload.request_id, media_info=None)
+                print(f"result info_obj = {info_obj}")
+                result = await Config.KAFKA_INTERFACE_OBJ.send_msg(payload=info_obj, topic="tg-responses")
+                print(f"response kafka msg = {result}")
+
+            except Exception as ex:
+                Config.LOGGER.error(f"Act get_media_file_info | The action failed to complete. ex: {ex}")
 
-            print(f"result info_obj = {info_obj}")
-            result = await Config.KAFKA_INTERFACE_OBJ.send_msg(payload=info_obj, topic="tg-responses")
+    @staticmethod
+    async def get_media_file_info_bulk(payload: MediaFileInfoBulkRequest):
+        try:
+            messages = await UserActions.get_messages_by_ids(payload.chat_id, payload.message_ids)
+
+            items = []
+            for msg_id in payload.message_ids:
+                msg = messages.get(msg_id)
+                media_info = await TgTools.get_media_file_info(msg) if msg and msg.media else None
+                items.append(MediaFileInfoItem(
+                    message_id=msg_id,
+                    status=Ut.STATUS_SUCCESS if media_info else Ut.STATUS_FAIL,
+                    media_info=media_info
+                ))
+
+            info_obj = MediaFileInfoBulkResponse(
+                status=await UserActions.bulk_status(items), request_id=payload.request_id, items=items)
+            result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+                payload=info_obj, topic=Config.KAFKA_TOPIC_RESPONSES, request_type="media_file_info_bulk")
             print(f"response kafka msg = {result}")
 
+        except (FloodWaitError, SlowModeWaitError):
+            raise
+
         except Exception as ex:
-            Config.LOGGER.error(f"Act get_media_file_info | The action failed to complete. ex: {ex}")
+            Config.LOGGER.error(f"Act get_media_file_info_bulk | The action failed to complete. ex: {ex}")
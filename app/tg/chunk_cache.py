@@ -0,0 +1,148 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.config import Config
+
+
+class ChunkCache:
+    ENTRIES: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+    TOTAL_BYTES = 0
+    HITS = 0
+    MISSES = 0
+    BYTES_SAVED = 0
+    EVICTIONS = 0
+    STALE_TMP_AGE = 600
+
+    @staticmethod
+    async def enabled() -> bool:
+        return Config.STREAM_CACHE_MAX_BYTES > 0
+
+    @staticmethod
+    async def chunk_path(file_key: str, index: int) -> str:
+        return os.path.join(Config.STREAM_CACHE_DIR, file_key, f"{index}.chunk")
+
+    @classmethod
+    def scan_dir(cls) -> List[Tuple[float, str, int, int]]:
+        found = []
+        now = time.time()
+        with os.scandir(Config.STREAM_CACHE_DIR) as dirs:
+            for entry in dirs:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+
+                with os.scandir(entry.path) as files:
+                    for file in files:
+                        if not file.is_file(follow_symlinks=False):
+                            continue
+
+                        stat = file.stat()
+                        if file.name.endswith(".tmp"):
+                            if now - stat.st_mtime > cls.STALE_TMP_AGE:
+                                os.remove(file.path)
+
+                            continue
+
+                        index = file.name[:-len(".chunk")]
+                        if file.name.endswith(".chunk") and index.isdigit():
+                            found.append((stat.st_atime, entry.name, int(index), stat.st_size))
+
+        return sorted(found)
+
+    @classmethod
+    async def init_cache(cls):
+        if not await cls.enabled():
+            return
+
+        os.makedirs(Config.STREAM_CACHE_DIR, exist_ok=True)
+        for _, file_key, index, size in await asyncio.to_thread(cls.scan_dir):
+            cls.ENTRIES[(file_key, index)] = size
+            cls.TOTAL_BYTES += size
+
+        await cls.evict()
+        Config.LOGGER.info(f"ChunkCache | Loaded {len(cls.ENTRIES)} chunks, {cls.TOTAL_BYTES} bytes")
+
+    @staticmethod
+    def read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @classmethod
+    async def read(cls, file_key: str, index: int) -> Optional[bytes]:
+        if (file_key, index) not in cls.ENTRIES:
+            cls.MISSES += 1
+            return None
+
+        try:
+            chunk = await asyncio.to_thread(cls.read_file, await cls.chunk_path(file_key, index))
+
+        except OSError as ex:
+            Config.LOGGER.warning(f"ChunkCache | Unable to read {file_key}:{index}! ex: {ex}")
+            await cls.forget(file_key, index)
+            cls.MISSES += 1
+            return None
+
+        cls.ENTRIES.move_to_end((file_key, index))
+        cls.HITS += 1
+        cls.BYTES_SAVED += len(chunk)
+        return chunk
+
+    @staticmethod
+    def write_file(path: str, chunk: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(chunk)
+
+        os.replace(tmp_path, path)
+
+    @classmethod
+    async def write(cls, file_key: str, index: int, chunk: bytes):
+        if not chunk or (file_key, index) in cls.ENTRIES or len(chunk) > Config.STREAM_CACHE_MAX_BYTES:
+            return
+
+        try:
+            await asyncio.to_thread(cls.write_file, await cls.chunk_path(file_key, index), chunk)
+
+        except OSError as ex:
+            Config.LOGGER.warning(f"ChunkCache | Unable to store {file_key}:{index}! ex: {ex}")
+            return
+
+        cls.ENTRIES[(file_key, index)] = len(chunk)
+        cls.TOTAL_BYTES += len(chunk)
+        await cls.evict()
+
+    @classmethod
+    async def forget(cls, file_key: str, index: int):
+        size = cls.ENTRIES.pop((file_key, index), None)
+        if size is None:
+            return
+
+        cls.TOTAL_BYTES -= size
+        try:
+            os.remove(await cls.chunk_path(file_key, index))
+
+        except OSError:
+            pass
+
+    @classmethod
+    async def evict(cls):
+        while cls.ENTRIES and cls.TOTAL_BYTES > Config.STREAM_CACHE_MAX_BYTES:
+            (file_key, index), _ = next(iter(cls.ENTRIES.items()))
+            await cls.forget(file_key, index)
+            cls.EVICTIONS += 1
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        lookups = cls.HITS + cls.MISSES
+        return {
+            "chunks": len(cls.ENTRIES),
+            "bytes": cls.TOTAL_BYTES,
+            "hits": cls.HITS,
+            "misses": cls.MISSES,
+            "hit_ratio": round(cls.HITS / lookups, 4) if lookups else 0.0,
+            "bytes_saved": cls.BYTES_SAVED,
+            "evictions": cls.EVICTIONS,
+        }
@@ -0,0 +1,250 @@
+from collections import OrderedDict
+from contextvars import ContextVar
+from time import monotonic
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from telethon import TelegramClient
+from telethon.tl import types
+
+from app.config import Config
+from app.tg.peer_resolver import PeerResolver
+from app.tg.redis_service import RedisInterface
+from app.tg.session_lease import SessionLease
+
+
+class PoolMember:
+    def __init__(self, session_name: str, client: TelegramClient):
+        self.session_name = session_name
+        self.client = client
+        self.chats: Set[int] = set()
+        self.flood_until = 0.0
+
+    def in_flood(self) -> bool:
+        return self.flood_until > monotonic()
+
+
+class ClientPool:
+    MEMBERS: List[PoolMember] = []
+    AFFINITY: Dict[int, PoolMember] = {}
+    CURRENT: ContextVar[Optional[PoolMember]] = ContextVar("current_pool_member", default=None)
+    SEEN_EVENTS: "OrderedDict[Hashable, float]" = OrderedDict()
+    OWNERS: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+    DUPLICATES = 0
+
+    @classmethod
+    async def init_pool(cls, register_handlers: Callable[[PoolMember], Awaitable]) -> bool:
+        cls.MEMBERS = [PoolMember(Config.TG_SESSION_NAME, Config.TG_CLIENT)]
+
+        for session_name in Config.TG_POOL_SESSIONS:
+            if Config.CLUSTER_MODE:
+                if not await SessionLease.try_acquire(session_name):
+                    Config.LOGGER.warning(
+                        f"ClientPool | Session {session_name} is leased by another instance, skipped!")
+                    continue
+
+                await SessionLease.keep(session_name)
+
+            client = TelegramClient(
+                session=session_name, api_id=Config.TG_API_ID, api_hash=Config.TG_API_HASH, flood_sleep_threshold=0)
+            try:
+                await client.connect()
+                if not await client.is_user_authorized():
+                    Config.LOGGER.critical(f"ClientPool | Session {session_name} is not authorized, skipped!")
+                    await client.disconnect()
+                    await SessionLease.release(session_name)
+                    continue
+
+            except Exception as ex:
+                Config.LOGGER.critical(f"ClientPool | Unable to connect session {session_name}! ex: {ex}")
+                await SessionLease.release(session_name)
+                continue
+
+            if Config.CLUSTER_MODE:
+                await SessionLease.attach(session_name, client)
+
+            cls.MEMBERS.append(PoolMember(session_name, client))
+
+        for member in cls.MEMBERS:
+            member.chats = await PeerResolver.feed_from_dialogs(client=member.client, session=member.session_name)
+            await register_handlers(member)
+
+        Config.LOGGER.info(f"ClientPool | {len(cls.MEMBERS)} account(s) ready")
+        return True
+
+    @classmethod
+    async def disconnect(cls):
+        for member in cls.MEMBERS[1:]:
+            await member.client.disconnect()
+
+    @classmethod
+    def current(cls) -> Optional[PoolMember]:
+        member = cls.CURRENT.get()
+        if member is None and cls.MEMBERS:
+            return cls.MEMBERS[0]
+
+        return member
+
+    @classmethod
+    def client(cls) -> TelegramClient:
+        member = cls.current()
+        return member.client if member else Config.TG_CLIENT
+
+    @classmethod
+    def session_name(cls) -> str:
+        member = cls.current()
+        return member.session_name if member else Config.TG_SESSION_NAME
+
+    @classmethod
+    def member_for(cls, client: TelegramClient) -> Optional[PoolMember]:
+        for member in cls.MEMBERS:
+            if member.client is client:
+                return member
+
+        return None
+
+    @classmethod
+    async def bind(cls, member: Optional[PoolMember], coro: Awaitable):
+        token = cls.CURRENT.set(member)
+        try:
+            return await coro
+
+        finally:
+            cls.CURRENT.reset(token)
+
+    @classmethod
+    async def remember_chats(cls, member: PoolMember, chat_ids):
+        member.chats.update(chat_ids)
+
+    @classmethod
+    async def candidates(cls, chat_id: int) -> List[PoolMember]:
+        members = [member for member in cls.MEMBERS if chat_id in member.chats]
+        return members or list(cls.MEMBERS)
+
+    @staticmethod
+    async def shares_message_ids(chat_id: int) -> bool:
+        return str(chat_id).startswith("-100")
+
+    @classmethod
+    async def member_by_session(cls, session_name: str) -> Optional[PoolMember]:
+        for member in cls.MEMBERS:
+            if member.session_name == session_name:
+                return member
+
+        return None
+
+    @classmethod
+    async def remember_messages(cls, member: Optional[PoolMember], chat_id: int, message_ids: List[int]):
+        if member is None or len(cls.MEMBERS) < 2 or not message_ids:
+            return
+
+        for msg_id in message_ids:
+            cls.OWNERS[(chat_id, msg_id)] = member.session_name
+            cls.OWNERS.move_to_end((chat_id, msg_id))
+
+        while len(cls.OWNERS) > Config.POOL_OWNER_CACHE_SIZE:
+            cls.OWNERS.popitem(last=False)
+
+        await RedisInterface().set_message_owners(
+            chat_id=chat_id, message_ids=message_ids, session=member.session_name, ttl=Config.POOL_OWNER_TTL)
+
+    @classmethod
+    async def owner_of(cls, chat_id: int, message_ids: List[int]) -> Optional[PoolMember]:
+        for msg_id in message_ids:
+            session_name = cls.OWNERS.get((chat_id, msg_id))
+            if session_name is not None:
+                return await cls.member_by_session(session_name)
+
+        for session_name in await RedisInterface().get_message_owners(chat_id, message_ids):
+            if session_name is not None:
+                return await cls.member_by_session(session_name.decode("utf-8"))
+
+        return None
+
+    @classmethod
+    async def is_pinned(cls, chat_id: int, request_type: Optional[str], message_ids: List[int]) -> bool:
+        if not message_ids:
+            return False
+
+        return request_type == "edit_message" or not await cls.shares_message_ids(chat_id)
+
+    @classmethod
+    async def pick(
+            cls, chat_id: int, request_type: Optional[str] = None, message_ids: Optional[List[int]] = None
+    ) -> Optional[PoolMember]:
+        if not cls.MEMBERS:
+            return None
+
+        if message_ids and len(cls.MEMBERS) > 1:
+            owner = await cls.owner_of(chat_id, message_ids)
+            if owner is not None:
+                return owner
+
+        candidates = await cls.candidates(chat_id)
+        preferred = cls.AFFINITY.get(chat_id)
+        if await cls.is_pinned(chat_id, request_type, message_ids or []):
+            if preferred not in candidates:
+                preferred = cls.AFFINITY[chat_id] = candidates[0]
+
+            return preferred
+
+        if preferred in candidates and not preferred.in_flood():
+            return preferred
+
+        for member in candidates:
+            if not member.in_flood():
+                cls.AFFINITY[chat_id] = member
+                return member
+
+        return min(candidates, key=lambda m: m.flood_until)
+
+    @classmethod
+    async def mark_flood(cls, member: Optional[PoolMember], seconds: float):
+        if member is not None:
+            member.flood_until = max(member.flood_until, monotonic() + seconds)
+
+    @classmethod
+    async def has_alternative(
+            cls, chat_id: int, member: Optional[PoolMember], request_type: Optional[str] = None,
+            message_ids: Optional[List[int]] = None
+    ) -> bool:
+        if message_ids and (await cls.is_pinned(chat_id, request_type, message_ids) or
+                            await cls.owner_of(chat_id, message_ids) is not None):
+            return False
+
+        return any(m is not member and not m.in_flood() for m in await cls.candidates(chat_id))
+
+    @staticmethod
+    async def message_key(msg: types.Message) -> Hashable:
+        if isinstance(msg.peer_id, types.PeerChannel):
+            return msg.chat_id, msg.id
+
+        return msg.chat_id, msg.sender_id, int(msg.date.timestamp()), hash(msg.message)
+
+    @classmethod
+    async def is_duplicate(cls, key: Hashable) -> bool:
+        if len(cls.MEMBERS) < 2:
+            return False
+
+        now = monotonic()
+        while cls.SEEN_EVENTS:
+            oldest_key, seen_at = next(iter(cls.SEEN_EVENTS.items()))
+            if now - seen_at < Config.INBOUND_DEDUP_TTL and len(cls.SEEN_EVENTS) < Config.INBOUND_DEDUP_SIZE:
+                break
+
+            cls.SEEN_EVENTS.popitem(last=False)
+
+        if key in cls.SEEN_EVENTS:
+            cls.DUPLICATES += 1
+            return True
+
+        cls.SEEN_EVENTS[key] = now
+        return False
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "accounts": [
+                {"session": m.session_name, "chats": len(m.chats), "in_flood": m.in_flood()} for m in cls.MEMBERS
+            ],
+            "duplicate_events": cls.DUPLICATES,
+        }
@@ -0,0 +1,262 @@
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from telethon import events
+from telethon.errors import FloodWaitError, SlowModeWaitError
+
+from app.api.kafka_models import ActionResponse, EditMessageRequest, MediaFileInfoRequest
+from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.dedup import RequestDeduplicator
+from app.tg.handlers import HandleEvents
+from app.tg.scheduler import ActionScheduler
+from app.utils import Utils as Ut
+
+
+class KeyedCoalescer:
+    def __init__(
+            self,
+            window: float,
+            on_flush: Callable[[Hashable, object], Awaitable],
+            on_superseded: Optional[Callable[[object, object], Awaitable]] = None,
+            is_newer: Optional[Callable[[object, object], bool]] = None
+    ):
+        self.window = window
+        self.on_flush = on_flush
+        self.on_superseded = on_superseded
+        self.is_newer = is_newer
+        self.pending: Dict[Hashable, object] = {}
+        self.timers: Dict[Hashable, asyncio.Task] = {}
+        self.absorbed = 0
+        self.flushed = 0
+
+    async def submit(self, key: Hashable, item):
+        if key not in self.pending:
+            self.pending[key] = item
+            self.timers[key] = asyncio.create_task(self.flush_later(key))
+            return
+
+        current = self.pending[key]
+        if self.is_newer is None or self.is_newer(current, item):
+            self.pending[key] = item
+            superseded, kept = current, item
+
+        else:
+            superseded, kept = item, current
+
+        self.absorbed += 1
+        if self.on_superseded:
+            await self.on_superseded(superseded, kept)
+
+    async def flush_later(self, key: Hashable):
+        await asyncio.sleep(self.window)
+
+        item = self.pending.pop(key)
+        self.timers.pop(key, None)
+        self.flushed += 1
+
+        try:
+            await self.on_flush(key, item)
+
+        except Exception as ex:
+            Config.LOGGER.error(f"KeyedCoalescer | Flush failed! key: {key}; ex: {ex}")
+
+    def stats(self) -> Dict:
+        return {"pending": len(self.pending), "absorbed": self.absorbed, "flushed": self.flushed}
+
+
+class EditCoalescer:
+    COALESCER: Optional[KeyedCoalescer] = None
+    PRIORITIES: Dict[str, Optional[str]] = {}
+    QUEUED: Dict[Tuple[int, int], partial] = {}
+    ACKS: Set[asyncio.Task] = set()
+    REPLACED = 0
+
+    @classmethod
+    async def init_coalescer(cls):
+        cls.COALESCER = KeyedCoalescer(
+            window=Config.EDIT_COALESCE_WINDOW, on_flush=cls.flush, on_superseded=cls.merged)
+
+    @classmethod
+    async def submit(cls, payload: EditMessageRequest, action: partial, priority: Optional[str] = None):
+        key = (payload.chat_id, payload.message_id)
+        if key in cls.QUEUED:
+            return await cls.replace(key, action)
+
+        if Config.EDIT_COALESCE_WINDOW <= 0:
+            return await cls.flush(key, action, priority)
+
+        if cls.COALESCER is None:
+            await cls.init_coalescer()
+
+        cls.PRIORITIES[payload.request_id] = priority
+        await cls.COALESCER.submit(key, action)
+
+    @classmethod
+    async def replace(cls, key: Tuple[int, int], action: partial):
+        superseded, cls.QUEUED[key] = cls.QUEUED[key], action
+        cls.REPLACED += 1
+        await cls.merged(superseded, action)
+
+    @classmethod
+    async def flush(cls, key: Tuple[int, int], action: partial, priority: Optional[str] = None):
+        payload = action.args[0]
+        if key in cls.QUEUED:
+            cls.PRIORITIES.pop(payload.request_id, None)
+            return await cls.replace(key, action)
+
+        cls.QUEUED[key] = action
+        await ActionScheduler.submit(
+            chat_id=payload.chat_id, request_type="edit_message", action=partial(cls.dispatch, payload),
+            priority=cls.PRIORITIES.pop(payload.request_id, priority), request_id=payload.request_id
+        )
+
+    @classmethod
+    async def dispatch(cls, payload: EditMessageRequest):
+        key = (payload.chat_id, payload.message_id)
+        action = cls.QUEUED.pop(key, None)
+        if action is None:
+            return None
+
+        try:
+            return await action()
+
+        except (FloodWaitError, SlowModeWaitError):
+            newer = cls.QUEUED.setdefault(key, action)
+            if newer is not action:
+                await cls.merged(action, newer)
+
+            raise
+
+    @classmethod
+    async def merged(cls, superseded: partial, kept: partial):
+        cls.PRIORITIES.pop(superseded.args[0].request_id, None)
+
+        task = asyncio.create_task(cls.ack_merged(superseded.args[0], kept.args[0]))
+        cls.ACKS.add(task)
+        task.add_done_callback(cls.ACKS.discard)
+
+    @staticmethod
+    async def ack_merged(superseded_payload: EditMessageRequest, kept_payload: EditMessageRequest):
+        try:
+            await RequestDeduplicator.finish(superseded_payload.request_id, "edit_message", [])
+
+            result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+                payload=ActionResponse(
+                    status=Ut.STATUS_MERGED,
+                    request_id=superseded_payload.request_id,
+                    merged_into=kept_payload.request_id
+                ),
+                topic=Config.KAFKA_TOPIC_RESPONSES,
+                request_type="edit_message"
+            )
+            print(f"response kafka msg = {result}")
+
+        except Exception as ex:
+            Config.LOGGER.error(f"EditCoalescer | Unable to ack merged edit {superseded_payload.request_id}! ex: {ex}")
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        stats = cls.COALESCER.stats() if cls.COALESCER else {"pending": 0, "absorbed": 0, "flushed": 0}
+        stats.update(queued=len(cls.QUEUED), replaced_in_queue=cls.REPLACED)
+        return stats
+
+
+class MediaInfoBatcher:
+    PENDING: Dict[Tuple[int, Optional[str]], List[partial]] = {}
+    TIMERS: Dict[Tuple[int, Optional[str]], asyncio.Task] = {}
+    BATCHED = 0
+    FLUSHED = 0
+
+    @classmethod
+    async def submit(cls, payload: MediaFileInfoRequest, action: partial, priority: Optional[str] = None):
+        if Config.MEDIA_INFO_BATCH_WINDOW <= 0:
+            return await ActionScheduler.submit(
+                chat_id=payload.chat_id, request_type="media_file_info", action=action, priority=priority,
+                request_id=payload.request_id
+            )
+
+        key = (payload.chat_id, priority)
+        actions = cls.PENDING.setdefault(key, [])
+        actions.append(action)
+
+        if len(actions) >= Config.TG_MAX_IDS_PER_CALL:
+            timer = cls.TIMERS.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+
+            await cls.flush(key)
+
+        elif key not in cls.TIMERS:
+            cls.TIMERS[key] = asyncio.create_task(cls.flush_later(key))
+
+    @classmethod
+    async def flush_later(cls, key: Tuple[int, Optional[str]]):
+        await asyncio.sleep(Config.MEDIA_INFO_BATCH_WINDOW)
+
+        try:
+            await cls.flush(key)
+
+        except Exception as ex:
+            Config.LOGGER.error(f"MediaInfoBatcher | Flush failed! key: {key}; ex: {ex}")
+
+    @classmethod
+    async def flush(cls, key: Tuple[int, Optional[str]]):
+        actions = cls.PENDING.pop(key)
+        cls.TIMERS.pop(key, None)
+        cls.FLUSHED += 1
+        cls.BATCHED += len(actions)
+
+        chat_id, priority = key
+        await ActionScheduler.submit(
+            chat_id=chat_id, request_type="media_file_info",
+            action=partial(actions[0].func, *(action.args[0] for action in actions)), priority=priority
+        )
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "pending": sum(len(actions) for actions in cls.PENDING.values()),
+            "batched": cls.BATCHED,
+            "flushed": cls.FLUSHED
+        }
+
+
+class EditDebouncer:
+    COALESCER: Optional[KeyedCoalescer] = None
+
+    @staticmethod
+    def is_newer(current: events.MessageEdited.Event, new: events.MessageEdited.Event) -> bool:
+        current_date, new_date = current.message.edit_date, new.message.edit_date
+        if current_date is None or new_date is None:
+            return True
+
+        return new_date >= current_date
+
+    @classmethod
+    async def init_debouncer(cls):
+        cls.COALESCER = KeyedCoalescer(
+            window=Config.INBOUND_EDIT_DEBOUNCE_WINDOW, on_flush=cls.flush, is_newer=cls.is_newer)
+
+    @classmethod
+    async def submit(cls, event: events.MessageEdited.Event):
+        if Config.INBOUND_EDIT_DEBOUNCE_WINDOW <= 0:
+            return await cls.flush(None, event)
+
+        if cls.COALESCER is None:
+            await cls.init_debouncer()
+
+        await cls.COALESCER.submit((event.chat_id, event.message.id), event)
+
+    @staticmethod
+    async def flush(key, event: events.MessageEdited.Event):
+        await Config.QUEUE_WORKER.put(
+            ClientPool.bind(ClientPool.member_for(event.client), HandleEvents.processing_message_edited(event)))
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        if cls.COALESCER is None:
+            return {"pending": 0, "absorbed": 0, "flushed": 0}
+
+        return cls.COALESCER.stats()
@@ -0,0 +1,138 @@
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from app.api.kafka_models import ActionResponse
+from app.config import Config
+from app.tg.redis_service import RedisInterface
+from app.utils import Utils as Ut
+
+
+class RequestDeduplicator:
+    PENDING = "pending"
+
+    RECENT: "OrderedDict[str, str]" = OrderedDict()
+    INFLIGHT: Set[str] = set()
+    REFRESHER: Optional[asyncio.Task] = None
+    DUPLICATES = 0
+    IN_PROGRESS = 0
+
+    @classmethod
+    async def remember(cls, request_id: str, record: str):
+        cls.RECENT[request_id] = record
+        cls.RECENT.move_to_end(request_id)
+        while len(cls.RECENT) > Config.DEDUP_MEMORY_SIZE:
+            cls.RECENT.popitem(last=False)
+
+    @classmethod
+    async def pending_record(cls) -> str:
+        return f"{cls.PENDING}:{Config.INSTANCE_ID}"
+
+    @classmethod
+    async def hold(cls, request_id: str):
+        await cls.remember(request_id, cls.PENDING)
+        cls.INFLIGHT.add(request_id)
+        if cls.REFRESHER is None or cls.REFRESHER.done():
+            cls.REFRESHER = asyncio.create_task(cls.refresh_loop())
+
+    @classmethod
+    async def reserve(cls, request_id: str) -> Optional[str]:
+        record = cls.RECENT.get(request_id)
+        if record is not None:
+            return record
+
+        pending_record = await cls.pending_record()
+        if await RedisInterface().reserve_request(
+                request_id=request_id, record=pending_record, ttl=Config.DEDUP_PENDING_TTL):
+            await cls.hold(request_id)
+            return None
+
+        record = await RedisInterface().get_request_record(request_id)
+        if record is None:
+            return None
+
+        if record == pending_record:
+            Config.LOGGER.warning(f"RequestDeduplicator | Taking over a stale reservation. request_id: {request_id}")
+            await RedisInterface().set_request_record(
+                request_id=request_id, record=pending_record, ttl=Config.DEDUP_PENDING_TTL)
+            await cls.hold(request_id)
+            return None
+
+        await cls.remember(request_id, record)
+        return record
+
+    @classmethod
+    async def is_duplicate(cls, request_id: str, request_type: str) -> bool:
+        if request_type not in Config.DEDUP_REQUEST_TYPES:
+            return False
+
+        record = await cls.reserve(request_id)
+        if record is None:
+            return False
+
+        if record.startswith(cls.PENDING):
+            cls.IN_PROGRESS += 1
+            status, message_ids = Ut.STATUS_IN_PROGRESS, []
+            Config.LOGGER.warning(
+                f"RequestDeduplicator | {request_type} is still in progress, skipped. request_id: {request_id}")
+
+        else:
+            cls.DUPLICATES += 1
+            status, message_ids = Ut.STATUS_DUPLICATE, json.loads(record).get("message_ids", [])
+            Config.LOGGER.warning(f"RequestDeduplicator | Duplicate {request_type} skipped. request_id: {request_id}")
+
+        result = await Config.KAFKA_INTERFACE_OBJ.send_msg(
+            payload=ActionResponse(status=status, request_id=request_id, message_ids=message_ids),
+            topic=Config.KAFKA_TOPIC_RESPONSES,
+            request_type=request_type
+        )
+        print(f"response kafka msg = {result}")
+        return True
+
+    @classmethod
+    async def touch(cls, request_id: Optional[str]):
+        if request_id in cls.INFLIGHT:
+            await RedisInterface().refresh_request_reservations(
+                request_ids=[request_id], record=await cls.pending_record(), ttl=Config.DEDUP_PENDING_TTL)
+
+    @classmethod
+    async def refresh_loop(cls):
+        while cls.INFLIGHT:
+            await asyncio.sleep(Config.DEDUP_PENDING_TTL / 3)
+            if cls.INFLIGHT:
+                await RedisInterface().refresh_request_reservations(
+                    request_ids=list(cls.INFLIGHT), record=await cls.pending_record(), ttl=Config.DEDUP_PENDING_TTL)
+
+    @classmethod
+    async def complete(cls, request_id: str, message_ids: List[int]):
+        cls.INFLIGHT.discard(request_id)
+        record = json.dumps({"message_ids": message_ids})
+        await cls.remember(request_id, record)
+        await RedisInterface().set_request_record(request_id=request_id, record=record, ttl=Config.DEDUP_TTL)
+
+    @classmethod
+    async def release(cls, request_id: str):
+        cls.INFLIGHT.discard(request_id)
+        cls.RECENT.pop(request_id, None)
+        await RedisInterface().delete_request_record(request_id)
+
+    @classmethod
+    async def finish(cls, request_id: Optional[str], request_type: str, result: Optional[List[int]]):
+        if request_id is None or request_type not in Config.DEDUP_REQUEST_TYPES:
+            return
+
+        if result is None:
+            await cls.release(request_id)
+
+        else:
+            await cls.complete(request_id, result)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "recent": len(cls.RECENT),
+            "inflight": len(cls.INFLIGHT),
+            "duplicates": cls.DUPLICATES,
+            "in_progress": cls.IN_PROGRESS
+        }
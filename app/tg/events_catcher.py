@@ -1,15 +1,33 @@
+from functools import partial
 from typing import Union
 
 from telethon import events
 from telethon.tl import types
 
 from app.config import Config
+from app.tg.client_pool import ClientPool, PoolMember
+from app.tg.coalescer import EditDebouncer
 from app.tg.handlers import HandleEvents
+from app.tg.media_stream import MediaDescriptors
+from app.tg.peer_resolver import PeerResolver
 from app.tg.redis_service import RedisInterface
 
 
 class EventsCatcher:
 
+    @staticmethod
+    async def register_handlers(member: PoolMember):
+        client = member.client
+        client.add_event_handler(EventsCatcher.event_new_message, events.NewMessage())
+        client.add_event_handler(EventsCatcher.event_message_edited, events.MessageEdited())
+        client.add_event_handler(EventsCatcher.event_message_deleted, events.MessageDeleted())
+        client.add_event_handler(EventsCatcher.event_chat_action, events.ChatAction())
+        client.add_event_handler(partial(EventsCatcher.event_raw, member=member), events.Raw())
+
+    @staticmethod
+    async def enqueue(member: PoolMember, coro):
+        await Config.QUEUE_WORKER.put(ClientPool.bind(member, coro))
+
     @staticmethod
     async def check_chat_id(chat_id: Union[int, types.PeerChat, types.PeerChannel, types.PeerUser]) -> bool:
         if isinstance(chat_id, types.PeerChat):
@@ -33,14 +51,28 @@ class EventsCatcher:
         if not await EventsCatcher.check_chat_id(event.message.peer_id):
             return
 
-        await Config.QUEUE_WORKER.put(HandleEvents.processing_new_message(event))
+        if await ClientPool.is_duplicate(("new", await ClientPool.message_key(event.message))):
+            return
+
+        member = ClientPool.member_for(event.client)
+        if not await ClientPool.shares_message_ids(event.chat_id):
+            await ClientPool.remember_messages(member, event.chat_id, [event.message.id])
+
+        await EventsCatcher.enqueue(member, HandleEvents.processing_new_message(event))
 
     @staticmethod
     async def event_message_edited(event: events.MessageEdited.Event):
         Config.LOGGER.info("New event: MessageEdited")
+        await MediaDescriptors.forget(event.chat_id, event.message.id)
+
+        if not await EventsCatcher.check_chat_id(event.message.peer_id):
+            return
+
+        edit_date = event.message.edit_date.timestamp() if event.message.edit_date else None
+        if await ClientPool.is_duplicate(("edit", await ClientPool.message_key(event.message), edit_date)):
+            return
 
-        if await EventsCatcher.check_chat_id(event.message.peer_id):
-            await Config.QUEUE_WORKER.put(HandleEvents.processing_message_edited(event))
+        await EditDebouncer.submit(event)
 
     @staticmethod
     async def event_message_deleted(event: events.MessageDeleted.Event):
@@ -49,6 +81,8 @@ class EventsCatcher:
         org_upd = event.original_update
         if isinstance(org_upd, types.UpdateDeleteChannelMessages):
             chat_id = int(f"100{org_upd.channel_id}")
+            if await ClientPool.is_duplicate(("delete", org_upd.channel_id, tuple(sorted(org_upd.messages)))):
+                return
 
         elif isinstance(org_upd, types.UpdateDeleteMessages):
             chat_id = await RedisInterface().get_chat_id_of_del_msg(org_upd.messages)
@@ -59,7 +93,8 @@ class EventsCatcher:
             return
 
         if await EventsCatcher.check_chat_id(int(chat_id)):
-            await Config.QUEUE_WORKER.put(HandleEvents.processing_message_deleted(event))
+            await EventsCatcher.enqueue(
+                ClientPool.member_for(event.client), HandleEvents.processing_message_deleted(event))
 
     @staticmethod
     async def event_chat_action(event: events.ChatAction.Event):
@@ -69,30 +104,39 @@ class EventsCatcher:
         if not await EventsCatcher.check_chat_id(act_msg.peer_id):
             return
 
-        me = await Config.TG_CLIENT.get_me()
+        member = ClientPool.member_for(event.client)
+        me = await event.client.get_me()
         if isinstance(act_msg.action, types.MessageActionChatAddUser) and me.id in act_msg.action.users:
-            await Config.QUEUE_WORKER.put(HandleEvents.processing_action_add_chat_user(event))
+            await EventsCatcher.enqueue(member, HandleEvents.processing_action_add_chat_user(event))
 
         elif isinstance(act_msg.action, types.MessageActionChatDeleteUser) and me.id == act_msg.action.user_id:
-            await Config.QUEUE_WORKER.put(HandleEvents.processing_action_chat_delete_user(event))
+            await EventsCatcher.enqueue(member, HandleEvents.processing_action_chat_delete_user(event))
 
     @staticmethod
-    async def event_raw(event: events.Raw):
+    async def event_raw(event: events.Raw, member: PoolMember):
+        entities = getattr(event, "_entities", None)
+        if entities:
+            await PeerResolver.feed(entities.values(), session=member.session_name)
+            await ClientPool.remember_chats(member, entities.keys())
+
         if isinstance(event, types.UpdateNewChannelMessage):
             action = event.message.action
             if not action:
                 return
 
+            if await ClientPool.is_duplicate(("raw", await ClientPool.message_key(event.message))):
+                return
+
             if isinstance(action, types.MessageActionTopicCreate):
                 Config.LOGGER.info("New event: Raw:MessageActionTopicCreate")
                 if not await EventsCatcher.check_chat_id(event.message.peer_id):
                     return
 
-                await Config.QUEUE_WORKER.put(HandleEvents.processing_create_topic(event))
+                await EventsCatcher.enqueue(member, HandleEvents.processing_create_topic(event))
 
             elif isinstance(action, types.MessageActionTopicEdit):
                 Config.LOGGER.info("New event: Raw:MessageActionTopicEdit")
                 if not await EventsCatcher.check_chat_id(event.message.peer_id):
                     return
 
-                await Config.QUEUE_WORKER.put(HandleEvents.processing_topic_edited(event))
+                await EventsCatcher.enqueue(member, HandleEvents.processing_topic_edited(event))
@@ -4,10 +4,12 @@ from telethon import events
 from telethon.tl.functions.channels import GetParticipantsRequest
 from telethon.tl.types import PeerChat
 
+from app.api.events_sink import EventsSink
 from app.api.webhook import *
 from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.media_store import MediaStore
 from app.tg.redis_service import RedisInterface
-from app.utils import Utils as Ut
 from app.tg.tg_tools import TgTools
 
 
@@ -30,7 +32,7 @@ class HandleEvents:
             elif isinstance(item, types.Channel):
                 chat = item
 
-        sender = sender if sender else await Config.TG_CLIENT.get_entity(msg_obj.from_id)
+        sender = sender if sender else await ClientPool.client().get_entity(msg_obj.from_id)
         if not sender:
             return None
 
@@ -42,8 +44,7 @@ class HandleEvents:
         if not chat_id:
             return None
 
-        await APIInterface.send_request(
-            utils_obj=Ut,
+        await EventsSink.publish(
             req_model=TopicCreated(
                 chat_id=msg_obj.peer_id.channel_id,
                 topic_id=msg_obj.id,
@@ -58,6 +59,7 @@ class HandleEvents:
     @staticmethod
     async def processing_new_message(event: events.NewMessage.Event):
         msg_obj = event.message
+        await MediaStore.store_later(msg_obj)
 
         # from_user = await FromUser.obj_from_sender(event.sender)
         # if not from_user:
@@ -73,8 +75,7 @@ class HandleEvents:
         # topic_id = await TgTools.get_topic_data_from_msg(msg_obj, only_id=True)
         # msg_type, media = await TgTools.get_media_data_from_msg(msg_obj)
         #
-        # await APIInterface.send_request(
-        #     utils_obj=Ut,
+        # await EventsSink.publish(
         #     req_model=MessageCreated(
         #         chat_id=chat_id,
         #         message_id=msg_obj.id,
@@ -103,8 +104,8 @@ class HandleEvents:
         msg_type, media = await TgTools.get_media_data_from_msg(msg_obj)
         topic_id = await TgTools.get_topic_data_from_msg(msg_obj, only_id=True)
 
-        await APIInterface.send_request(
-            utils_obj=Ut,
+        await MediaStore.publish(
+            msg_obj=msg_obj,
             req_model=MessageEdited(
                 chat_id=chat_id,
                 message_id=msg_obj.id,
@@ -186,7 +187,7 @@ class HandleEvents:
         else:
             return
 
-        await APIInterface.send_request(utils_obj=Ut, req_model=req_model)
+        await EventsSink.publish(req_model=req_model)
 
     @staticmethod
     async def processing_action_add_chat_user(event: events.ChatAction.Event):
@@ -196,22 +197,22 @@ class HandleEvents:
         if not chat_id:
             return
 
-        added_by_user = await Config.TG_CLIENT.get_entity(act_msg.from_id)
+        added_by_user = await ClientPool.client().get_entity(act_msg.from_id)
         added_by = await FromUser.obj_from_sender(added_by_user)
         if not added_by:
             return
 
         owner_info = None
         if isinstance(act_msg.peer_id, types.PeerChat):
-            full_chat = await Config.TG_CLIENT(GetFullChatRequest(act_msg.peer_id.chat_id))
+            full_chat = await ClientPool.client()(GetFullChatRequest(act_msg.peer_id.chat_id))
             for member in full_chat.full_chat.participants.participants:
                 if isinstance(member, types.ChatParticipantCreator):
-                    user = await Config.TG_CLIENT.get_entity(member)
+                    user = await ClientPool.client().get_entity(member)
                     owner_info = await FromUser.obj_from_sender(user)
                     break
 
         elif isinstance(act_msg.peer_id, types.PeerChannel):
-            channel_admins = await Config.TG_CLIENT(GetParticipantsRequest(
+            channel_admins = await ClientPool.client()(GetParticipantsRequest(
                 channel=act_msg.peer_id,
                 filter=types.ChannelParticipantsAdmins(),
                 offset=0,
@@ -235,8 +236,7 @@ class HandleEvents:
         else:
             return
 
-        await APIInterface.send_request(
-            utils_obj=Ut,
+        await EventsSink.publish(
             req_model=BotAdded(
                 chat_id=chat_id,
                 chat_info=chat_info,
@@ -260,8 +260,7 @@ class HandleEvents:
         else:
             return
 
-        await APIInterface.send_request(
-            utils_obj=Ut,
+        await EventsSink.publish(
             req_model=BotDeleted(
                 chat_id=chat_id,
                 timestamp=act_msg.date.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -274,7 +273,7 @@ class HandleEvents:
 
         print(f"processing_topic_edited; {event._entities}")
 
-        sender = await Config.TG_CLIENT.get_entity(msg_obj.from_id)
+        sender = await ClientPool.client().get_entity(msg_obj.from_id)
         from_user = await FromUser.obj_from_sender(sender)
         if not from_user:
             return None
@@ -284,8 +283,7 @@ class HandleEvents:
             return None
 
         topic_id, title, icon_color = await TgTools.get_topic_data_from_msg(msg_obj)
-        return await APIInterface.send_request(
-            utils_obj=Ut,
+        return await EventsSink.publish(
             req_model=TopicEdited(
                 chat_id=chat_id,
                 topic_id=topic_id,
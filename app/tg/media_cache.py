@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import ClientTimeout
+from telethon.tl import types
+
+from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.peer_resolver import PeerResolver
+from app.tg.redis_service import RedisInterface
+
+
+class MediaReuseCache:
+    CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+    HITS = 0
+    MISSES = 0
+    REFRESHES = 0
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    async def source_key(file: str) -> str:
+        return f"url:{hashlib.sha1(file.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    async def is_url(file: str) -> bool:
+        return file.startswith(("http://", "https://"))
+
+    @staticmethod
+    async def validator(file: str) -> Optional[str]:
+        if os.path.isfile(file):
+            stat = os.stat(file)
+            return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+        if not await MediaReuseCache.is_url(file):
+            return None
+
+        try:
+            async with Config.AIOHTTP_SESSION.head(
+                    file, allow_redirects=True, timeout=ClientTimeout(total=Config.MEDIA_REUSE_HEAD_TIMEOUT)) as resp:
+                if resp.status >= 400:
+                    return None
+
+                return "|".join(resp.headers.get(header, "") for header in ("ETag", "Last-Modified", "Content-Length"))
+
+        except Exception as ex:
+            Config.LOGGER.warning(f"MediaReuseCache | Unable to validate {file}! ex: {ex}")
+            return None
+
+    @staticmethod
+    async def record_from_msg(msg: types.Message) -> Optional[Dict]:
+        if isinstance(msg.media, types.MessageMediaPhoto) and isinstance(msg.media.photo, types.Photo):
+            kind, media = "photo", msg.media.photo
+
+        elif isinstance(msg.media, types.MessageMediaDocument) and isinstance(msg.media.document, types.Document):
+            kind, media = "document", msg.media.document
+
+        else:
+            return None
+
+        return {
+            "kind": kind,
+            "id": media.id,
+            "access_hash": media.access_hash,
+            "file_reference": media.file_reference.hex(),
+            "chat_id": msg.chat_id,
+            "message_id": msg.id,
+        }
+
+    @staticmethod
+    async def input_media(record: Dict):
+        file_reference = bytes.fromhex(record["file_reference"])
+        if record["kind"] == "photo":
+            return types.InputPhoto(id=record["id"], access_hash=record["access_hash"], file_reference=file_reference)
+
+        return types.InputDocument(id=record["id"], access_hash=record["access_hash"], file_reference=file_reference)
+
+    @classmethod
+    async def remember(cls, key: str, record: Dict):
+        cls.CACHE[key] = record
+        cls.CACHE.move_to_end(key)
+        while len(cls.CACHE) > Config.MEDIA_REUSE_CACHE_SIZE:
+            cls.CACHE.popitem(last=False)
+
+    @classmethod
+    async def get(cls, key: str) -> Optional[Dict]:
+        session = ClientPool.session_name()
+        record = cls.CACHE.get(f"{session}:{key}")
+        if record is not None:
+            return record
+
+        data = await RedisInterface().get_media_record(session=session, key=key)
+        if not data:
+            return None
+
+        record = json.loads(data)
+        await cls.remember(f"{session}:{key}", record)
+        return record
+
+    @classmethod
+    async def lookup(cls, file: str) -> Tuple[Optional[Dict], Dict]:
+        probe = {"validator": await cls.validator(file), "content_hash": None}
+
+        record = await cls.get(await cls.source_key(file))
+        if record is not None and record.get("validator") != probe["validator"]:
+            record = None
+
+        if record is None and os.path.isfile(file):
+            probe["content_hash"] = await asyncio.to_thread(cls.file_digest, file)
+            record = await cls.get(f"hash:{probe['content_hash']}")
+
+        if record is None:
+            cls.MISSES += 1
+
+        else:
+            cls.HITS += 1
+
+        return record, probe
+
+    @classmethod
+    async def store(
+            cls, file: str, msg: types.Message, validator: Optional[str] = None, content_hash: Optional[str] = None
+    ) -> Optional[Dict]:
+        record = await cls.record_from_msg(msg)
+        if record is None:
+            return None
+
+        if content_hash is None and os.path.isfile(file):
+            content_hash = await asyncio.to_thread(cls.file_digest, file)
+
+        record.update(validator=validator, content_hash=content_hash)
+        source_ttl = Config.MEDIA_REUSE_URL_TTL if await cls.is_url(file) else Config.MEDIA_REUSE_TTL
+        keys: List[Tuple[str, int]] = [(await cls.source_key(file), source_ttl)]
+        if content_hash:
+            keys.append((f"hash:{content_hash}", Config.MEDIA_REUSE_TTL))
+
+        session = ClientPool.session_name()
+        for key, ttl in keys:
+            await cls.remember(f"{session}:{key}", record)
+            await RedisInterface().set_media_record(session=session, key=key, record=json.dumps(record), ttl=ttl)
+
+        return record
+
+    @classmethod
+    async def refresh(cls, file: str, record: Dict) -> Optional[Dict]:
+        cls.REFRESHES += 1
+        try:
+            msg = await ClientPool.client().get_messages(
+                await PeerResolver.get_input_peer(record["chat_id"], session=ClientPool.session_name()),
+                ids=record["message_id"]
+            )
+
+        except Exception as ex:
+            Config.LOGGER.warning(f"MediaReuseCache | Unable to refresh file reference! ex: {ex}")
+            msg = None
+
+        if not msg or not msg.media:
+            await cls.invalidate(file, record)
+            return None
+
+        return await cls.store(file, msg, validator=record.get("validator"), content_hash=record.get("content_hash"))
+
+    @classmethod
+    async def invalidate(cls, file: str, record: Optional[Dict] = None):
+        session = ClientPool.session_name()
+        key = await cls.source_key(file)
+        if record is None:
+            record = await cls.get(key)
+
+        keys = [key]
+        if record is not None and record.get("content_hash"):
+            keys.append(f"hash:{record['content_hash']}")
+
+        for key in keys:
+            cls.CACHE.pop(f"{session}:{key}", None)
+            await RedisInterface().delete_media_record(session=session, key=key)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {"cached": len(cls.CACHE), "hits": cls.HITS, "misses": cls.MISSES, "refreshes": cls.REFRESHES}
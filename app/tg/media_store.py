@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from pydantic import BaseModel
+from telethon import utils
+from telethon.tl import types
+
+from app.api.events_sink import EventsSink
+from app.api.webhook import MediaStored
+from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.redis_service import RedisInterface
+
+
+class MediaStore:
+    SEMAPHORE: Optional[asyncio.Semaphore] = None
+    PATHS: "OrderedDict[int, str]" = OrderedDict()
+    INFLIGHT: Dict[int, asyncio.Task] = {}
+    PENDING: Set[asyncio.Task] = set()
+    DOWNLOADS = 0
+    DEDUP_HITS = 0
+    SKIPPED = 0
+    FAILED = 0
+
+    @classmethod
+    async def semaphore(cls) -> asyncio.Semaphore:
+        if cls.SEMAPHORE is None:
+            cls.SEMAPHORE = asyncio.Semaphore(Config.MEDIA_STORE_CONCURRENCY)
+
+        return cls.SEMAPHORE
+
+    @staticmethod
+    async def media_type(msg_obj: types.Message) -> Optional[str]:
+        for type_name in ("sticker", "gif", "voice", "video", "audio", "photo", "document"):
+            if getattr(msg_obj, type_name, None):
+                return type_name
+
+        return None
+
+    @staticmethod
+    async def media_id(msg_obj: types.Message) -> Optional[int]:
+        media = msg_obj.photo or msg_obj.document
+        return media.id if media else None
+
+    @classmethod
+    async def wanted(cls, msg_obj: types.Message) -> bool:
+        if not Config.MEDIA_STORE_CHATS or msg_obj.chat_id not in Config.MEDIA_STORE_CHATS:
+            return False
+
+        return await cls.media_type(msg_obj) in Config.MEDIA_STORE_TYPES
+
+    @staticmethod
+    def file_digest(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def place_file(tmp_path: str, digest: str, extension: str) -> str:
+        path = os.path.join(Config.MEDIA_STORE_DIR, digest[:2], digest[2:4], f"{digest}{extension}")
+        if os.path.exists(path):
+            os.remove(tmp_path)
+
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+
+        return path
+
+    @classmethod
+    async def remember(cls, media_id: int, path: str):
+        cls.PATHS[media_id] = path
+        cls.PATHS.move_to_end(media_id)
+        while len(cls.PATHS) > Config.MEDIA_STORE_INDEX_SIZE:
+            cls.PATHS.popitem(last=False)
+
+    @classmethod
+    async def known_path(cls, media_id: int) -> Optional[str]:
+        path = cls.PATHS.get(media_id) or await RedisInterface().get_stored_media(media_id)
+        if path and os.path.exists(path):
+            await cls.remember(media_id, path)
+            return path
+
+        return None
+
+    @classmethod
+    async def download(cls, msg_obj: types.Message, media_id: int) -> str:
+        async with await cls.semaphore():
+            os.makedirs(Config.MEDIA_STORE_DIR, exist_ok=True)
+            tmp_path = os.path.join(Config.MEDIA_STORE_DIR, f"{media_id}.{os.getpid()}.part")
+            try:
+                await ClientPool.client().download_media(msg_obj, file=tmp_path)
+                digest = await asyncio.to_thread(cls.file_digest, tmp_path)
+                path = await asyncio.to_thread(
+                    cls.place_file, tmp_path, digest, utils.get_extension(msg_obj.media))
+
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        cls.DOWNLOADS += 1
+        await cls.remember(media_id, path)
+        await RedisInterface().set_stored_media(media_id, path)
+        return path
+
+    @classmethod
+    async def store(cls, msg_obj: types.Message) -> Optional[str]:
+        media_id = await cls.media_id(msg_obj)
+        if media_id is None:
+            return None
+
+        path = await cls.known_path(media_id)
+        if path:
+            cls.DEDUP_HITS += 1
+            return path
+
+        task = cls.INFLIGHT.get(media_id)
+        if task is None:
+            task = cls.INFLIGHT[media_id] = asyncio.create_task(cls.download(msg_obj, media_id))
+            task.add_done_callback(lambda _: cls.INFLIGHT.pop(media_id, None))
+
+        else:
+            cls.DEDUP_HITS += 1
+
+        return await asyncio.shield(task)
+
+    @classmethod
+    async def store_quietly(cls, msg_obj: types.Message) -> Optional[str]:
+        try:
+            return await cls.store(msg_obj)
+
+        except Exception as ex:
+            cls.FAILED += 1
+            Config.LOGGER.error(f"MediaStore | Unable to store media of message {msg_obj.id}! ex: {ex}")
+
+        return None
+
+    @classmethod
+    async def store_and_announce(cls, msg_obj: types.Message):
+        path = await cls.store_quietly(msg_obj)
+        if path:
+            await EventsSink.publish(req_model=MediaStored(
+                chat_id=msg_obj.chat_id, message_id=msg_obj.id, stored_path=path))
+
+    @classmethod
+    async def schedule(cls, coro) -> bool:
+        if len(cls.PENDING) >= Config.MEDIA_STORE_MAX_PENDING:
+            cls.SKIPPED += 1
+            coro.close()
+            return False
+
+        task = asyncio.create_task(coro)
+        cls.PENDING.add(task)
+        task.add_done_callback(cls.PENDING.discard)
+        return True
+
+    @classmethod
+    async def store_later(cls, msg_obj: types.Message):
+        if await cls.wanted(msg_obj):
+            await cls.schedule(cls.store_and_announce(msg_obj))
+
+    @classmethod
+    async def publish(cls, req_model: BaseModel, msg_obj: types.Message):
+        if await cls.wanted(msg_obj):
+            media_id = await cls.media_id(msg_obj)
+            req_model.stored_path = await cls.known_path(media_id) if media_id is not None else None
+            if req_model.stored_path:
+                cls.DEDUP_HITS += 1
+
+            else:
+                await cls.schedule(cls.store_and_announce(msg_obj))
+
+        return await EventsSink.publish(req_model=req_model)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "pending": len(cls.PENDING),
+            "downloads": cls.DOWNLOADS,
+            "dedup_hits": cls.DEDUP_HITS,
+            "skipped": cls.SKIPPED,
+            "failed": cls.FAILED,
+        }
@@ -0,0 +1,351 @@
+import asyncio
+from collections import OrderedDict
+from contextlib import aclosing
+from functools import partial
+from time import monotonic
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from telethon import TelegramClient
+from telethon.errors import FileReferenceExpiredError, FileReferenceInvalidError, FloodWaitError
+from telethon.tl import types
+
+from app.config import Config
+from app.tg.chunk_cache import ChunkCache
+from app.tg.client_pool import ClientPool
+from app.tg.peer_resolver import PeerResolver
+from app.tg.telethon_compat import TelethonCompat
+from app.utils import LatencyWindow
+
+
+class StreamStats:
+
+    def __init__(self, key: str):
+        self.key = key
+        self.bytes = 0
+        self.started_at = monotonic()
+
+    def throughput(self) -> float:
+        return self.bytes / 1048576 / max(monotonic() - self.started_at, 1e-6)
+
+
+class MediaDescriptor:
+    def __init__(self, chat_id: int, msg_id: int, media):
+        self.chat_id = chat_id
+        self.msg_id = msg_id
+        self.location, self.dc_id, self.size = TelethonCompat.file_location(media)
+        self.mime_type = "image/jpeg"
+        if isinstance(media, types.MessageMediaDocument) and isinstance(media.document, types.Document):
+            self.mime_type = media.document.mime_type or "application/octet-stream"
+
+        thumb_size = getattr(self.location, "thumb_size", "")
+        self.file_key = f"{self.location.id}-{thumb_size}" if thumb_size else str(self.location.id)
+        self.lock = asyncio.Lock()
+        self.expires_at = monotonic() + Config.STREAM_DESCRIPTOR_TTL
+
+
+class MediaDescriptors:
+    CACHE: "OrderedDict[Tuple[str, int, int], MediaDescriptor]" = OrderedDict()
+    HITS = 0
+    MISSES = 0
+    REFRESHES = 0
+
+    @classmethod
+    async def fetch_media(cls, client: TelegramClient, chat_id: int, msg_id: int):
+        msg = await client.get_messages(
+            await PeerResolver.get_input_peer(chat_id, session=ClientPool.session_name()), ids=msg_id)
+        return msg.media if msg else None
+
+    @classmethod
+    async def get(cls, client: TelegramClient, chat_id: int, msg_id: int) -> Optional[MediaDescriptor]:
+        key = (ClientPool.session_name(), chat_id, msg_id)
+        descriptor = cls.CACHE.get(key)
+        if descriptor is not None and descriptor.expires_at <= monotonic():
+            cls.CACHE.pop(key)
+            descriptor = None
+
+        if descriptor is not None:
+            cls.HITS += 1
+            cls.CACHE.move_to_end(key)
+            return descriptor
+
+        cls.MISSES += 1
+        media = await cls.fetch_media(client, chat_id, msg_id)
+        if not media:
+            return None
+
+        try:
+            descriptor = MediaDescriptor(chat_id, msg_id, media)
+
+        except TypeError:
+            return None
+
+        cls.CACHE[key] = descriptor
+        while len(cls.CACHE) > Config.STREAM_DESCRIPTOR_CACHE_SIZE:
+            cls.CACHE.popitem(last=False)
+
+        return descriptor
+
+    @classmethod
+    async def refresh(cls, client: TelegramClient, descriptor: MediaDescriptor, stale_reference: bytes):
+        async with descriptor.lock:
+            if descriptor.location.file_reference != stale_reference:
+                return
+
+            cls.REFRESHES += 1
+            media = await cls.fetch_media(client, descriptor.chat_id, descriptor.msg_id)
+            if not media:
+                cls.CACHE.pop((ClientPool.session_name(), descriptor.chat_id, descriptor.msg_id), None)
+                raise FileNotFoundError(f"Media {descriptor.chat_id}/{descriptor.msg_id} is no longer available")
+
+            descriptor.location = TelethonCompat.file_location(media)[0]
+
+    @classmethod
+    async def forget(cls, chat_id: int, msg_id: int):
+        for member in ClientPool.MEMBERS:
+            cls.CACHE.pop((member.session_name, chat_id, msg_id), None)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {"cached": len(cls.CACHE), "hits": cls.HITS, "misses": cls.MISSES, "refreshes": cls.REFRESHES}
+
+
+class StreamFanOut:
+    WINDOWS: Dict[str, "OrderedDict[int, bytes]"] = {}
+    READERS: Dict[str, int] = {}
+    INFLIGHT: Dict[Tuple[str, int], asyncio.Task] = {}
+    WAITERS: Dict[Tuple[str, int], int] = {}
+    WINDOW_HITS = 0
+    SHARED_FETCHES = 0
+
+    @classmethod
+    async def join(cls, file_key: str):
+        cls.READERS[file_key] = cls.READERS.get(file_key, 0) + 1
+        cls.WINDOWS.setdefault(file_key, OrderedDict())
+
+    @classmethod
+    async def leave(cls, file_key: str):
+        cls.READERS[file_key] -= 1
+        if not cls.READERS[file_key]:
+            cls.READERS.pop(file_key)
+            cls.WINDOWS.pop(file_key, None)
+
+    @classmethod
+    def finished(cls, key: Tuple[str, int], task: asyncio.Task):
+        if cls.INFLIGHT.get(key) is task:
+            cls.INFLIGHT.pop(key)
+
+    @classmethod
+    async def get(cls, file_key: str, index: int,
+                  load: Callable[[], Awaitable[bytes]]) -> bytes:
+        window = cls.WINDOWS.get(file_key)
+        if window is not None and index in window:
+            cls.WINDOW_HITS += 1
+            window.move_to_end(index)
+            return window[index]
+
+        key = (file_key, index)
+        task = cls.INFLIGHT.get(key)
+        if task is None:
+            task = cls.INFLIGHT[key] = asyncio.create_task(load())
+            task.add_done_callback(partial(cls.finished, key))
+
+        else:
+            cls.SHARED_FETCHES += 1
+
+        cls.WAITERS[key] = cls.WAITERS.get(key, 0) + 1
+        try:
+            chunk = await asyncio.shield(task)
+
+        finally:
+            cls.WAITERS[key] -= 1
+            if not cls.WAITERS[key]:
+                cls.WAITERS.pop(key)
+                if not task.done():
+                    task.cancel()
+                    cls.finished(key, task)
+
+        window = cls.WINDOWS.get(file_key)
+        if window is not None:
+            window[index] = chunk
+            while len(window) > Config.STREAM_SHARED_WINDOW:
+                window.popitem(last=False)
+
+        return chunk
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "files": len(cls.READERS),
+            "readers": sum(cls.READERS.values()),
+            "window_chunks": sum(len(window) for window in cls.WINDOWS.values()),
+            "window_hits": cls.WINDOW_HITS,
+            "shared_fetches": cls.SHARED_FETCHES,
+        }
+
+
+class DownloadEngine:
+    SLOTS: Optional[asyncio.Semaphore] = None
+    ACTIVE: Dict[int, StreamStats] = {}
+    THROUGHPUT = LatencyWindow()
+    CHUNKS = 0
+    RETRIES = 0
+
+    @classmethod
+    async def slots(cls) -> asyncio.Semaphore:
+        if cls.SLOTS is None:
+            cls.SLOTS = asyncio.Semaphore(Config.STREAM_MAX_INFLIGHT)
+
+        return cls.SLOTS
+
+    @classmethod
+    async def window(cls) -> int:
+        fair_share = Config.STREAM_MAX_INFLIGHT // max(len(cls.ACTIVE), 1)
+        return max(1, min(Config.STREAM_PREFETCH_CHUNKS, fair_share))
+
+    @staticmethod
+    async def download(client: TelegramClient, location, dc_id: Optional[int], offset: int, limit: int) -> bytes:
+        async with client.iter_download(
+                location, offset=offset, request_size=limit, limit=1, dc_id=dc_id) as download:
+            async for chunk in download:
+                return chunk
+
+        return b""
+
+    @classmethod
+    async def fetch_chunk(cls, client: TelegramClient, descriptor: MediaDescriptor, index: int,
+                          chunk_size: int) -> bytes:
+        for attempt in range(Config.STREAM_CHUNK_RETRIES + 1):
+            location = descriptor.location
+            try:
+                async with await cls.slots():
+                    chunk = await cls.download(client, location, descriptor.dc_id, index * chunk_size, chunk_size)
+
+                cls.CHUNKS += 1
+                return chunk
+
+            except (FileReferenceExpiredError, FileReferenceInvalidError):
+                if attempt == Config.STREAM_CHUNK_RETRIES:
+                    raise
+
+                await MediaDescriptors.refresh(client, descriptor, location.file_reference)
+
+            except (FloodWaitError, ConnectionError, asyncio.TimeoutError) as ex:
+                if attempt == Config.STREAM_CHUNK_RETRIES:
+                    raise
+
+                cls.RETRIES += 1
+                await asyncio.sleep(ex.seconds if isinstance(ex, FloodWaitError) else min(2 ** attempt, 5))
+
+    @classmethod
+    async def load_chunk(cls, client: TelegramClient, descriptor: MediaDescriptor, index: int,
+                         chunk_size: int) -> bytes:
+        if not await ChunkCache.enabled():
+            return await cls.fetch_chunk(client, descriptor, index, chunk_size)
+
+        chunk = await ChunkCache.read(descriptor.file_key, index)
+        if chunk is None:
+            chunk = await cls.fetch_chunk(client, descriptor, index, chunk_size)
+            await ChunkCache.write(descriptor.file_key, index, chunk)
+
+        return chunk
+
+    @classmethod
+    async def iter_chunks(cls, client: TelegramClient, descriptor: MediaDescriptor, first: int, last: int,
+                          chunk_size: int, key: str) -> AsyncIterator[bytes]:
+        file_key = descriptor.file_key
+        stats = StreamStats(key)
+        cls.ACTIVE[id(stats)] = stats
+        pending: Dict[int, asyncio.Task] = {}
+        next_index = first
+        await StreamFanOut.join(file_key)
+
+        try:
+            for index in range(first, last + 1):
+                window = await cls.window()
+                while next_index <= last and len(pending) < window:
+                    pending[next_index] = asyncio.create_task(StreamFanOut.get(
+                        file_key, next_index,
+                        partial(cls.load_chunk, client, descriptor, next_index, chunk_size)
+                    ))
+                    next_index += 1
+
+                chunk = await pending.pop(index)
+                stats.bytes += len(chunk)
+                yield chunk
+
+                if len(chunk) < chunk_size:
+                    break
+
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+            await StreamFanOut.leave(file_key)
+            cls.ACTIVE.pop(id(stats), None)
+            if stats.bytes:
+                cls.THROUGHPUT.add(stats.throughput())
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "chunks": cls.CHUNKS,
+            "retries": cls.RETRIES,
+            "active": {stats.key: round(stats.throughput(), 2) for stats in cls.ACTIVE.values()},
+            "throughput_mb_s": cls.THROUGHPUT.percentiles(),
+        }
+
+
+class MediaStream:
+    CHUNK_SIZE = 512 * 1024
+
+    @staticmethod
+    async def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+        if not header or not header.strip().startswith("bytes="):
+            return None
+
+        spec = header.strip()[len("bytes="):]
+        if "," in spec:
+            return None
+
+        first, _, last = spec.partition("-")
+        try:
+            if not first:
+                length = int(last)
+                return (max(size - length, 0), size - 1) if length > 0 else (size, size - 1)
+
+            start = int(first)
+            end = int(last) if last else None
+
+        except ValueError:
+            return None
+
+        if end is None or end >= size:
+            end = size - 1
+
+        elif end < start:
+            return None
+
+        return start, end
+
+    @classmethod
+    async def iter_range(cls, client: TelegramClient, descriptor: MediaDescriptor, start: int,
+                         end: int) -> AsyncIterator[bytes]:
+        skip = start % cls.CHUNK_SIZE
+        remaining = end - start + 1
+
+        chunks = DownloadEngine.iter_chunks(
+            client, descriptor, start // cls.CHUNK_SIZE, end // cls.CHUNK_SIZE, cls.CHUNK_SIZE,
+            key=f"{descriptor.file_key}:{start}-{end}"
+        )
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if skip:
+                    chunk = chunk[skip:]
+                    skip = 0
+
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+                yield chunk
+
+                if remaining <= 0:
+                    break
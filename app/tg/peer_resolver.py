@@ -0,0 +1,118 @@
+from collections import OrderedDict
+from typing import Iterable, Optional, Set, Tuple, Union
+
+from telethon import TelegramClient, utils as tg_utils
+from telethon.tl import types
+
+from app.config import Config
+from app.tg.redis_service import RedisInterface
+
+
+class PeerResolver:
+    CACHE: "OrderedDict[Tuple[str, int], types.TypeInputPeer]" = OrderedDict()
+
+    @staticmethod
+    async def dump_input_peer(input_peer) -> Optional[str]:
+        if isinstance(input_peer, types.InputPeerUser):
+            return f"user:{input_peer.user_id}:{input_peer.access_hash}"
+
+        elif isinstance(input_peer, types.InputPeerChannel):
+            return f"channel:{input_peer.channel_id}:{input_peer.access_hash}"
+
+        elif isinstance(input_peer, types.InputPeerChat):
+            return f"chat:{input_peer.chat_id}:0"
+
+        return None
+
+    @staticmethod
+    async def load_input_peer(data: Union[str, bytes]):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+
+        peer_type, peer_id, access_hash = data.split(":")
+        if peer_type == "user":
+            return types.InputPeerUser(user_id=int(peer_id), access_hash=int(access_hash))
+
+        elif peer_type == "channel":
+            return types.InputPeerChannel(channel_id=int(peer_id), access_hash=int(access_hash))
+
+        elif peer_type == "chat":
+            return types.InputPeerChat(chat_id=int(peer_id))
+
+        return None
+
+    @staticmethod
+    async def bare_peer_from_id(chat_id: Union[str, int]):
+        chat_id = str(chat_id)
+        if chat_id.startswith("-100"):
+            return types.PeerChannel(channel_id=int(chat_id[4:]))
+
+        elif chat_id.startswith("-"):
+            return types.PeerChat(chat_id=int(chat_id[1:]))
+
+        else:
+            return types.PeerUser(user_id=int(chat_id))
+
+    @classmethod
+    async def remember(cls, session: str, chat_id: int, input_peer):
+        cls.CACHE[(session, chat_id)] = input_peer
+        cls.CACHE.move_to_end((session, chat_id))
+        while len(cls.CACHE) > Config.PEER_CACHE_SIZE:
+            cls.CACHE.popitem(last=False)
+
+    @classmethod
+    async def feed(cls, entities: Iterable, session: Optional[str] = None):
+        session = session or Config.TG_SESSION_NAME
+        new_peers = {}
+        for entity in entities:
+            try:
+                input_peer = tg_utils.get_input_peer(entity, allow_self=False)
+                chat_id = tg_utils.get_peer_id(input_peer)
+
+            except TypeError:
+                continue
+
+            cached = cls.CACHE.get((session, chat_id))
+            if cached == input_peer:
+                cls.CACHE.move_to_end((session, chat_id))
+                continue
+
+            await cls.remember(session, chat_id, input_peer)
+            dumped = await cls.dump_input_peer(input_peer)
+            if dumped:
+                new_peers[chat_id] = dumped
+
+        if new_peers:
+            await RedisInterface().set_input_peers(session=session, peers=new_peers)
+
+    @classmethod
+    async def feed_from_dialogs(
+            cls, client: Optional[TelegramClient] = None, session: Optional[str] = None) -> Set[int]:
+        client = client or Config.TG_CLIENT
+
+        entities = []
+        async for dialog in client.iter_dialogs():
+            entities.append(dialog.entity)
+
+        await cls.feed(entities, session=session)
+        Config.LOGGER.info(f"PeerResolver | Loaded {len(entities)} peers from dialogs. session: {session}")
+        return {tg_utils.get_peer_id(entity) for entity in entities}
+
+    @classmethod
+    async def get_input_peer(cls, chat_id: Union[str, int], session: Optional[str] = None):
+        session = session or Config.TG_SESSION_NAME
+        chat_id = int(chat_id)
+
+        input_peer = cls.CACHE.get((session, chat_id))
+        if input_peer is not None:
+            cls.CACHE.move_to_end((session, chat_id))
+            return input_peer
+
+        data = await RedisInterface().get_input_peer(session=session, chat_id=chat_id)
+        if data:
+            input_peer = await cls.load_input_peer(data)
+            if input_peer is not None:
+                await cls.remember(session, chat_id, input_peer)
+                return input_peer
+
+        return await cls.bare_peer_from_id(chat_id)
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Optional, Union, List, Tuple
+from typing import Optional, Union, List, Tuple, Dict
 
 from redis.asyncio import Redis
 from redis import AuthenticationError, BusyLoadingError
@@ -15,6 +15,33 @@ class RedisInterface:
     F_KEY_GROUPS_MSG = lambda msg_id: f"msg:{msg_id}"
     F_KEY_TOPIC_DATA = lambda chat_id, topic_id: f"topic:{chat_id}:{topic_id}"
     F_KEY_CHAT_DATA = lambda chat_id: f"chat:{chat_id}"
+    F_KEY_INPUT_PEER = lambda session, chat_id: f"peer:{session}:{chat_id}"
+    F_KEY_SESSION_LEASE = lambda session: f"lease:session:{session}"
+    F_KEY_MESSAGE_OWNER = lambda chat_id, msg_id: f"owner:{chat_id}:{msg_id}"
+    F_KEY_REQUEST = lambda request_id: f"req:{request_id}"
+    F_KEY_MEDIA = lambda session, key: f"media:{session}:{key}"
+    F_KEY_STORED_MEDIA = lambda media_id: f"stored:{media_id}"
+
+    LUA_RENEW_LEASE = """
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+        end
+        return 0
+    """
+    LUA_REFRESH_PENDING = """
+        for _, key in ipairs(KEYS) do
+            if redis.call("GET", key) == ARGV[1] then
+                redis.call("EXPIRE", key, ARGV[2])
+            end
+        end
+        return 0
+    """
+    LUA_RELEASE_LEASE = """
+        if redis.call("GET", KEYS[1]) == ARGV[1] then
+            return redis.call("DEL", KEYS[1])
+        end
+        return 0
+    """
 
     @classmethod
     async def init_redis(cls, retries: int = 3) -> bool:
@@ -90,6 +117,195 @@ class RedisInterface:
         except Exception as ex:
             Config.LOGGER.error(f"RedisInterface.get_chat_data | {ex}")
 
+    @classmethod
+    async def set_input_peers(cls, session: str, peers: Dict[int, str]) -> bool:
+        try:
+            pipe = cls.REDIS.pipeline(transaction=False)
+            for chat_id, data in peers.items():
+                pipe.set(cls.F_KEY_INPUT_PEER(session, chat_id), data)
+
+            await pipe.execute()
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.set_input_peers | {ex}")
+            return False
+
+    @classmethod
+    async def get_input_peer(cls, session: str, chat_id: Union[str, int]) -> Optional[bytes]:
+        try:
+            return await cls.REDIS.get(cls.F_KEY_INPUT_PEER(session, chat_id))
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.get_input_peer | {ex}")
+
+        return None
+
+    @classmethod
+    async def set_message_owners(cls, chat_id: int, message_ids: List[int], session: str, ttl: int) -> bool:
+        try:
+            pipe = cls.REDIS.pipeline(transaction=False)
+            for msg_id in message_ids:
+                pipe.set(cls.F_KEY_MESSAGE_OWNER(chat_id, msg_id), session, ex=ttl)
+
+            await pipe.execute()
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.set_message_owners | {ex}")
+            return False
+
+    @classmethod
+    async def get_message_owners(cls, chat_id: int, message_ids: List[int]) -> List[Optional[bytes]]:
+        try:
+            return await cls.REDIS.mget([cls.F_KEY_MESSAGE_OWNER(chat_id, msg_id) for msg_id in message_ids])
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.get_message_owners | {ex}")
+
+        return [None] * len(message_ids)
+
+    @classmethod
+    async def acquire_session_lease(cls, session: str, owner: str, ttl_ms: int) -> bool:
+        try:
+            return bool(await cls.REDIS.set(cls.F_KEY_SESSION_LEASE(session), owner, nx=True, px=ttl_ms))
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.acquire_session_lease | {ex}")
+            return False
+
+    @classmethod
+    async def renew_session_lease(cls, session: str, owner: str, ttl_ms: int) -> Optional[bool]:
+        try:
+            return bool(await cls.REDIS.eval(cls.LUA_RENEW_LEASE, 1, cls.F_KEY_SESSION_LEASE(session), owner, ttl_ms))
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.renew_session_lease | {ex}")
+            return None
+
+    @classmethod
+    async def get_session_lease_owner(cls, session: str) -> Tuple[bool, Optional[bytes]]:
+        try:
+            return True, await cls.REDIS.get(cls.F_KEY_SESSION_LEASE(session))
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.get_session_lease_owner | {ex}")
+            return False, None
+
+    @classmethod
+    async def release_session_lease(cls, session: str, owner: str) -> bool:
+        try:
+            return bool(await cls.REDIS.eval(cls.LUA_RELEASE_LEASE, 1, cls.F_KEY_SESSION_LEASE(session), owner))
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.release_session_lease | {ex}")
+            return False
+
+    @classmethod
+    async def reserve_request(cls, request_id: str, record: str, ttl: int) -> bool:
+        try:
+            return bool(await cls.REDIS.set(cls.F_KEY_REQUEST(request_id), record, nx=True, ex=ttl))
+
+        except Exception as ex:
+            Config.LOGGER.warning(
+                f"RedisInterface.reserve_request | Redis unavailable, {request_id} is not deduplicated! ex: {ex}")
+            return True
+
+    @classmethod
+    async def refresh_request_reservations(cls, request_ids: List[str], record: str, ttl: int) -> bool:
+        try:
+            await cls.REDIS.eval(
+                cls.LUA_REFRESH_PENDING, len(request_ids), *[cls.F_KEY_REQUEST(i) for i in request_ids], record, ttl)
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.refresh_request_reservations | {ex}")
+            return False
+
+    @classmethod
+    async def get_request_record(cls, request_id: str) -> Optional[str]:
+        try:
+            result = await cls.REDIS.get(cls.F_KEY_REQUEST(request_id))
+            if result:
+                return result.decode("utf-8")
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.get_request_record | {ex}")
+
+        return None
+
+    @classmethod
+    async def set_request_record(cls, request_id: str, record: str, ttl: int) -> bool:
+        try:
+            await cls.REDIS.set(cls.F_KEY_REQUEST(request_id), record, ex=ttl)
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.set_request_record | {ex}")
+            return False
+
+    @classmethod
+    async def delete_request_record(cls, request_id: str) -> bool:
+        try:
+            await cls.REDIS.delete(cls.F_KEY_REQUEST(request_id))
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.delete_request_record | {ex}")
+            return False
+
+    @classmethod
+    async def set_media_record(cls, session: str, key: str, record: str, ttl: int) -> bool:
+        try:
+            await cls.REDIS.set(cls.F_KEY_MEDIA(session, key), record, ex=ttl)
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.set_media_record | {ex}")
+            return False
+
+    @classmethod
+    async def get_media_record(cls, session: str, key: str) -> Optional[bytes]:
+        try:
+            return await cls.REDIS.get(cls.F_KEY_MEDIA(session, key))
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.get_media_record | {ex}")
+
+        return None
+
+    @classmethod
+    async def delete_media_record(cls, session: str, key: str) -> bool:
+        try:
+            await cls.REDIS.delete(cls.F_KEY_MEDIA(session, key))
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.delete_media_record | {ex}")
+            return False
+
+    @classmethod
+    async def set_stored_media(cls, media_id: int, path: str) -> bool:
+        try:
+            await cls.REDIS.set(cls.F_KEY_STORED_MEDIA(media_id), path)
+            return True
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.set_stored_media | {ex}")
+            return False
+
+    @classmethod
+    async def get_stored_media(cls, media_id: int) -> Optional[str]:
+        try:
+            result = await cls.REDIS.get(cls.F_KEY_STORED_MEDIA(media_id))
+            if result:
+                return result.decode("utf-8")
+
+        except Exception as ex:
+            Config.LOGGER.error(f"RedisInterface.get_stored_media | {ex}")
+
+        return None
+
     @classmethod
     async def set_chat_id(cls, chat_id: int, msg_id: Union[str, int]) -> bool:
         try:
@@ -0,0 +1,332 @@
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from telethon.errors import FloodWaitError, SlowModeWaitError
+
+from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.dedup import RequestDeduplicator
+from app.utils import LatencyWindow
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+        self.paused_until = 0.0
+
+    def refill(self):
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        self.refill()
+        pause = max(0.0, self.paused_until - monotonic())
+        if self.tokens >= 1:
+            return pause
+
+        return max(pause, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        self.refill()
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, monotonic() + seconds)
+
+
+class ScheduledAction:
+    __slots__ = (
+        "chat_id", "request_type", "request_id", "lane", "action", "message_ids", "enqueued_at", "attempts")
+
+    def __init__(
+            self, chat_id: int, request_type: str, request_id: Optional[str], lane: str,
+            action: Callable[[], Awaitable], message_ids: List[int]
+    ):
+        self.chat_id = chat_id
+        self.request_type = request_type
+        self.request_id = request_id
+        self.lane = lane
+        self.action = action
+        self.message_ids = message_ids
+        self.enqueued_at = monotonic()
+        self.attempts = 0
+
+
+class LaneQueue:
+    def __init__(self):
+        self.lanes: Dict[str, Deque] = {lane: deque() for lane in Config.LANE_WEIGHTS}
+        self.current: Dict[str, int] = {lane: 0 for lane in Config.LANE_WEIGHTS}
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self.lanes.values())
+
+    def append(self, lane: str, item):
+        self.lanes[lane].append((monotonic(), item))
+
+    def appendleft(self, lane: str, item, queued_at: Optional[float] = None):
+        self.lanes[lane].appendleft((queued_at or monotonic(), item))
+
+    def next_lane(self) -> Optional[str]:
+        now = monotonic()
+        active = [lane for lane, q in self.lanes.items() if q]
+        if not active:
+            return None
+
+        oldest = min(active, key=lambda lane: self.lanes[lane][0][0])
+        if now - self.lanes[oldest][0][0] >= Config.LANE_MAX_WAIT:
+            return oldest
+
+        total = 0
+        best = None
+        for lane in active:
+            self.current[lane] += Config.LANE_WEIGHTS[lane]
+            total += Config.LANE_WEIGHTS[lane]
+            if best is None or self.current[lane] > self.current[best]:
+                best = lane
+
+        self.current[best] -= total
+        return best
+
+    def pop(self):
+        lane = self.next_lane()
+        if lane is None:
+            raise IndexError("pop from an empty LaneQueue")
+
+        return self.lanes[lane].popleft()[1]
+
+
+class PriorityGate:
+    def __init__(self, slots: int):
+        self.free = slots
+        self.waiters = LaneQueue()
+
+    async def acquire(self, lane: str):
+        if self.free > 0 and not len(self.waiters):
+            self.free -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(lane, future)
+        try:
+            await future
+
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+
+            raise
+
+    def release(self):
+        while len(self.waiters):
+            future = self.waiters.pop()
+            if not future.done():
+                future.set_result(None)
+                return
+
+        self.free += 1
+
+
+class ActionProgress:
+    STATE: Dict[str, List] = {}
+
+    @classmethod
+    async def get(cls, request_id: str) -> List:
+        return cls.STATE.setdefault(request_id, [])
+
+    @classmethod
+    async def forget(cls, request_id: Optional[str]):
+        cls.STATE.pop(request_id, None)
+
+
+class ActionScheduler:
+    CHAT_QUEUES: Dict[int, LaneQueue] = {}
+    CHAT_BUCKETS: Dict[int, TokenBucket] = {}
+    CHAT_WORKERS: Dict[int, asyncio.Task] = {}
+    GLOBAL_BUCKET: Optional[TokenBucket] = None
+    ACCOUNT_BUCKETS: Dict[str, TokenBucket] = {}
+    GATE: Optional[PriorityGate] = None
+
+    WAIT_TIMES = LatencyWindow()
+    LANE_LATENCY: Dict[str, LatencyWindow] = {lane: LatencyWindow() for lane in Config.LANE_WEIGHTS}
+    FLOOD_WAITS = 0
+    DROPPED = 0
+
+    @classmethod
+    async def init_scheduler(cls):
+        cls.GLOBAL_BUCKET = TokenBucket(rate=Config.SCHED_GLOBAL_RATE, capacity=Config.SCHED_GLOBAL_BURST)
+        cls.GATE = PriorityGate(Config.SCHED_MAX_CONCURRENT)
+
+    @staticmethod
+    async def new_chat_bucket(chat_id: int) -> TokenBucket:
+        if chat_id < 0:
+            return TokenBucket(rate=Config.SCHED_GROUP_RATE, capacity=Config.SCHED_GROUP_BURST)
+
+        return TokenBucket(rate=Config.SCHED_PRIVATE_RATE, capacity=Config.SCHED_PRIVATE_BURST)
+
+    @staticmethod
+    async def lane_for(request_type: str, priority: Optional[str] = None) -> str:
+        if priority in Config.LANE_WEIGHTS:
+            return priority
+
+        lane = Config.LANE_DEFAULTS.get(request_type, Config.LANE_DEFAULT)
+        return lane if lane in Config.LANE_WEIGHTS else next(iter(Config.LANE_WEIGHTS))
+
+    @staticmethod
+    async def message_ids_of(action: Callable[[], Awaitable]) -> List[int]:
+        message_ids = []
+        for payload in getattr(action, "args", ()):
+            for field in ("message_id", "reply_to_message_id"):
+                if getattr(payload, field, None) is not None:
+                    message_ids.append(getattr(payload, field))
+
+            message_ids.extend(getattr(payload, "message_ids", None) or [])
+
+        return message_ids
+
+    @classmethod
+    async def submit(
+            cls, chat_id: int, request_type: str, action: Callable[[], Awaitable], priority: Optional[str] = None,
+            request_id: Optional[str] = None
+    ):
+        if cls.GLOBAL_BUCKET is None:
+            await cls.init_scheduler()
+
+        if chat_id not in cls.CHAT_BUCKETS:
+            cls.CHAT_BUCKETS[chat_id] = await cls.new_chat_bucket(chat_id)
+
+        lane = await cls.lane_for(request_type, priority)
+        if chat_id not in cls.CHAT_QUEUES:
+            cls.CHAT_QUEUES[chat_id] = LaneQueue()
+
+        cls.CHAT_QUEUES[chat_id].append(lane, ScheduledAction(
+            chat_id, request_type, request_id, lane, action, await cls.message_ids_of(action)))
+
+        worker = cls.CHAT_WORKERS.get(chat_id)
+        if worker is None or worker.done():
+            cls.CHAT_WORKERS[chat_id] = asyncio.create_task(cls.chat_worker(chat_id))
+
+    @classmethod
+    async def account_bucket(cls, session_name: Optional[str]) -> TokenBucket:
+        if session_name is None:
+            return cls.GLOBAL_BUCKET
+
+        if session_name not in cls.ACCOUNT_BUCKETS:
+            cls.ACCOUNT_BUCKETS[session_name] = TokenBucket(
+                rate=Config.SCHED_GLOBAL_RATE, capacity=Config.SCHED_GLOBAL_BURST)
+
+        return cls.ACCOUNT_BUCKETS[session_name]
+
+    @staticmethod
+    async def wait_for_bucket(bucket: TokenBucket):
+        delay = bucket.delay()
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = bucket.delay()
+
+    @classmethod
+    async def chat_worker(cls, chat_id: int):
+        queue = cls.CHAT_QUEUES[chat_id]
+        bucket = cls.CHAT_BUCKETS[chat_id]
+
+        try:
+            while len(queue):
+                await cls.wait_for_bucket(bucket)
+                item = queue.pop()
+
+                await cls.GATE.acquire(item.lane)
+                member = await ClientPool.pick(chat_id, item.request_type, item.message_ids)
+                try:
+                    account_bucket = await cls.account_bucket(member.session_name if member else None)
+                    await cls.wait_for_bucket(account_bucket)
+                    bucket.take()
+                    account_bucket.take()
+                    cls.WAIT_TIMES.add(monotonic() - item.enqueued_at)
+
+                    await RequestDeduplicator.touch(item.request_id)
+                    result = await ClientPool.bind(member, item.action())
+                    cls.LANE_LATENCY[item.lane].add(monotonic() - item.enqueued_at)
+                    if isinstance(result, list):
+                        await ClientPool.remember_messages(member, chat_id, result)
+
+                    await RequestDeduplicator.finish(item.request_id, item.request_type, result)
+                    await ActionProgress.forget(item.request_id)
+
+                except (FloodWaitError, SlowModeWaitError) as ex:
+                    cls.FLOOD_WAITS += 1
+                    item.attempts += 1
+                    if isinstance(ex, FloodWaitError):
+                        await ClientPool.mark_flood(member, ex.seconds)
+
+                    if await ClientPool.has_alternative(chat_id, member, item.request_type, item.message_ids):
+                        if isinstance(ex, FloodWaitError):
+                            account_bucket.pause(ex.seconds)
+
+                    else:
+                        bucket.pause(ex.seconds)
+
+                    if item.attempts > Config.SCHED_MAX_RETRIES:
+                        cls.DROPPED += 1
+                        Config.LOGGER.error(
+                            f"ActionScheduler | {item.request_type} dropped after {item.attempts} flood waits! "
+                            f"chat_id: {chat_id}")
+                        await RequestDeduplicator.finish(item.request_id, item.request_type, None)
+                        await ActionProgress.forget(item.request_id)
+                        continue
+
+                    Config.LOGGER.warning(
+                        f"ActionScheduler | FloodWait {ex.seconds}s on {item.request_type}, requeued. "
+                        f"chat_id: {chat_id}")
+                    queue.appendleft(item.lane, item, queued_at=item.enqueued_at)
+
+                except Exception as ex:
+                    Config.LOGGER.error(f"ActionScheduler | {item.request_type} failed! chat_id: {chat_id}; ex: {ex}")
+                    await RequestDeduplicator.finish(item.request_id, item.request_type, None)
+                    await ActionProgress.forget(item.request_id)
+
+                finally:
+                    cls.GATE.release()
+
+        finally:
+            if not len(queue):
+                cls.CHAT_QUEUES.pop(chat_id, None)
+                cls.CHAT_WORKERS.pop(chat_id, None)
+
+            await cls.prune_buckets()
+
+    @classmethod
+    async def prune_buckets(cls):
+        if len(cls.CHAT_BUCKETS) <= Config.SCHED_MAX_IDLE_BUCKETS:
+            return
+
+        now = monotonic()
+        for chat_id, bucket in list(cls.CHAT_BUCKETS.items()):
+            if chat_id in cls.CHAT_QUEUES or bucket.paused_until > now:
+                continue
+
+            bucket.refill()
+            if bucket.tokens >= bucket.capacity:
+                cls.CHAT_BUCKETS.pop(chat_id)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "queued": sum(len(q) for q in cls.CHAT_QUEUES.values()),
+            "active_chats": len(cls.CHAT_WORKERS),
+            "paused_chats": sum(1 for b in cls.CHAT_BUCKETS.values() if b.paused_until > monotonic()),
+            "flood_waits": cls.FLOOD_WAITS,
+            "dropped": cls.DROPPED,
+            "queue_wait_seconds": cls.WAIT_TIMES.percentiles(),
+            "lanes": {
+                lane: {
+                    "queued": sum(len(q.lanes[lane]) for q in cls.CHAT_QUEUES.values()),
+                    "latency_seconds": window.percentiles(),
+                }
+                for lane, window in cls.LANE_LATENCY.items()
+            },
+        }
@@ -0,0 +1,99 @@
+import asyncio
+from time import monotonic
+from typing import Dict
+
+from telethon import TelegramClient
+
+from app.config import Config
+from app.tg.redis_service import RedisInterface
+
+
+class SessionLease:
+    HELD: Dict[str, asyncio.Task] = {}
+    CLIENTS: Dict[str, TelegramClient] = {}
+
+    @staticmethod
+    async def try_acquire(session: str) -> bool:
+        return await RedisInterface().acquire_session_lease(
+            session=session, owner=Config.INSTANCE_ID, ttl_ms=int(Config.SESSION_LEASE_TTL * 1000))
+
+    @staticmethod
+    async def wait_acquire(session: str):
+        warned = False
+        while not await SessionLease.try_acquire(session):
+            if not warned:
+                Config.LOGGER.warning(
+                    f"SessionLease | Session {session} is held by another instance, standing by...")
+                warned = True
+
+            await asyncio.sleep(Config.SESSION_LEASE_TTL / 3)
+
+        Config.LOGGER.info(f"SessionLease | Lease for session {session} acquired by {Config.INSTANCE_ID}")
+
+    @classmethod
+    async def keep(cls, session: str):
+        cls.HELD[session] = asyncio.create_task(cls.renew_loop(session))
+
+    @classmethod
+    async def attach(cls, session: str, client: TelegramClient):
+        cls.CLIENTS[session] = client
+
+    @classmethod
+    async def lost(cls, session: str) -> bool:
+        ok, owner = await RedisInterface().get_session_lease_owner(session)
+        if not ok:
+            return False
+
+        if owner is None:
+            return not await SessionLease.try_acquire(session)
+
+        return owner.decode("utf-8") != Config.INSTANCE_ID
+
+    @classmethod
+    async def renew_loop(cls, session: str):
+        ttl_ms = int(Config.SESSION_LEASE_TTL * 1000)
+        renewed_at = monotonic()
+        delay = Config.SESSION_LEASE_TTL / 3
+        while True:
+            await asyncio.sleep(delay)
+            renewed = await RedisInterface().renew_session_lease(
+                session=session, owner=Config.INSTANCE_ID, ttl_ms=ttl_ms)
+            if renewed or (renewed is False and not await cls.lost(session)):
+                renewed_at = monotonic()
+                delay = Config.SESSION_LEASE_TTL / 3
+                continue
+
+            if renewed is None:
+                left = Config.SESSION_LEASE_TTL - (monotonic() - renewed_at)
+                Config.LOGGER.warning(
+                    f"SessionLease | Unable to renew the lease for session {session}, retrying. TTL left: {left:.1f}s")
+                delay = min(1.0, Config.SESSION_LEASE_TTL / 10)
+                continue
+
+            Config.LOGGER.critical(f"SessionLease | Lease for session {session} lost, disconnecting the client!")
+            client = cls.CLIENTS.get(session)
+            if client is not None:
+                await client.disconnect()
+
+            await SessionLease.wait_acquire(session)
+            renewed_at = monotonic()
+            delay = Config.SESSION_LEASE_TTL / 3
+            if client is not None:
+                await client.connect()
+                Config.LOGGER.info(f"SessionLease | Session {session} reconnected")
+
+    @classmethod
+    async def release(cls, session: str):
+        task = cls.HELD.pop(session, None)
+        if task is None:
+            return
+
+        task.cancel()
+
+        cls.CLIENTS.pop(session, None)
+        await RedisInterface().release_session_lease(session=session, owner=Config.INSTANCE_ID)
+
+    @classmethod
+    async def release_all(cls):
+        for session in list(cls.HELD):
+            await cls.release(session)
@@ -0,0 +1,70 @@
+import copy
+from typing import Optional, Tuple
+
+import telethon
+from telethon import TelegramClient
+from telethon.network import MTProtoSender
+from telethon.tl import types
+from telethon.tl.alltlobjects import LAYER
+from telethon.tl.functions import InvokeWithLayerRequest
+from telethon.tl.functions.help import GetConfigRequest
+
+FileLocation = Tuple[object, Optional[int], int]
+
+
+class TelethonCompat:
+    TESTED_VERSION = (1, 42)
+    VERSION = tuple(int(part) for part in telethon.__version__.split(".")[:2] if part.isdigit())
+
+    @classmethod
+    def private_api_supported(cls) -> bool:
+        return cls.VERSION == cls.TESTED_VERSION
+
+    @staticmethod
+    def photo_size_bytes(size) -> int:
+        if isinstance(size, types.PhotoSize):
+            return size.size
+
+        if isinstance(size, types.PhotoSizeProgressive):
+            return max(size.sizes) if size.sizes else 0
+
+        if isinstance(size, (types.PhotoCachedSize, types.PhotoStrippedSize)):
+            return len(size.bytes)
+
+        return 0
+
+    @staticmethod
+    def file_location(media) -> FileLocation:
+        if isinstance(media, types.MessageMediaDocument) and isinstance(media.document, types.Document):
+            document = media.document
+            location = types.InputDocumentFileLocation(
+                id=document.id, access_hash=document.access_hash, file_reference=document.file_reference,
+                thumb_size=""
+            )
+            return location, document.dc_id, document.size or 0
+
+        if isinstance(media, types.MessageMediaPhoto) and isinstance(media.photo, types.Photo) and media.photo.sizes:
+            photo = media.photo
+            size = photo.sizes[-1]
+            location = types.InputPhotoFileLocation(
+                id=photo.id, access_hash=photo.access_hash, file_reference=photo.file_reference, thumb_size=size.type
+            )
+            return location, photo.dc_id, TelethonCompat.photo_size_bytes(size)
+
+        raise TypeError(f"Unsupported media: {type(media).__name__}")
+
+    @classmethod
+    async def connect_sender(cls, client: TelegramClient) -> MTProtoSender:
+        if not cls.private_api_supported():
+            raise RuntimeError(f"Extra MTProto senders are not supported on Telethon {telethon.__version__}")
+
+        dc = await client._get_dc(client.session.dc_id)
+        sender = MTProtoSender(client.session.auth_key, loggers=client._log)
+        await sender.connect(client._connection(
+            dc.ip_address, dc.port, dc.id, loggers=client._log, proxy=client._proxy, local_addr=client._local_addr
+        ))
+
+        init_request = copy.copy(client._init_request)
+        init_request.query = GetConfigRequest()
+        await sender.send(InvokeWithLayerRequest(LAYER, init_request))
+        return sender
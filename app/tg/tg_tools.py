@@ -1,18 +1,24 @@
 import traceback
-from typing import List
+from collections import OrderedDict
+from typing import Dict, List, Optional
 
 from telethon.tl import types
 from telethon.errors import ChatAdminRequiredError
 from telethon.tl.functions.channels import GetAdminLogRequest
 from telethon.tl.functions.messages import GetStickerSetRequest, GetForumTopicsByIDRequest
 
+from app.api.kafka_models import MediaFileInfo
 from app.api.webhook import FromUser, MediaPhoto, MediaSticker, MediaAudio, MediaVideoGIF, MediaDocument
 from app.config import Config
+from app.tg.client_pool import ClientPool
 from app.tg.redis_service import RedisInterface
 from app.utils import Utils as Ut
 
 
 class TgTools:
+    MEDIA_ATTRIBUTES: "OrderedDict[int, Dict]" = OrderedDict()
+    MEDIA_ATTRIBUTES_HITS = 0
+    MEDIA_ATTRIBUTES_MISSES = 0
 
     @staticmethod
     async def get_userdata_deleted_by(message_ids: List[int], input_chat, retries: int = 3):
@@ -26,7 +32,7 @@ class TgTools:
             limit = 200
             max_id = 0
             for _ in range(5):
-                res = await Config.TG_CLIENT(
+                res = await ClientPool.client()(
                     GetAdminLogRequest(
                         channel=input_chat, events_filter=act_filter, limit=limit, max_id=max_id, min_id=0, q=""))
                 if not res.events:
@@ -38,7 +44,7 @@ class TgTools:
                         mid = getattr(act.message, "id", None)
                         print(res_event)
                         if mid in set(message_ids):
-                            user = await Config.TG_CLIENT.get_entity(res_event.user_id)
+                            user = await ClientPool.client().get_entity(res_event.user_id)
                             deleted_by = await FromUser.obj_from_sender(user)
                             if not deleted_by:
                                 raise ValueError("Variable `deleted_by` is empty")
@@ -48,7 +54,7 @@ class TgTools:
 
                     elif isinstance(act, types.ChannelAdminLogEventActionDeleteTopic):
                         if act.topic.id in message_ids:
-                            user = await Config.TG_CLIENT.get_entity(res_event.user_id)
+                            user = await ClientPool.client().get_entity(res_event.user_id)
                             deleted_by = await FromUser.obj_from_sender(user)
                             if not deleted_by:
                                 raise ValueError("Variable `deleted_by` is empty")
@@ -70,97 +76,176 @@ class TgTools:
         return None
 
     @staticmethod
-    async def get_media_data_from_msg(msg_obj: types.Message):
-        media = None
-        msg_type = 1
+    async def media_id(msg_obj: types.Message) -> Optional[int]:
+        if isinstance(msg_obj.media, types.MessageMediaPhoto) and msg_obj.media.photo:
+            return msg_obj.media.photo.id
 
+        elif isinstance(msg_obj.media, types.MessageMediaDocument) and msg_obj.media.document:
+            return msg_obj.media.document.id
+
+        return None
+
+    @staticmethod
+    async def extract_media_attributes(msg_obj: types.Message) -> Dict:
         if isinstance(msg_obj.media, types.MessageMediaPhoto):
-            best_size = await Ut.best_photo_size(photo=msg_obj.media.photo)
+            best_size = await Ut.best_photo_size(photo=msg_obj.media.photo) or {}
+            return {
+                "kind": "photo",
+                "file_size": best_size.get("size_bytes") or 0,
+                "mime_type": "image/jpeg",
+                "width": best_size.get("w"),
+                "height": best_size.get("h")
+            }
+
+        doc = msg_obj.media.document
+        result = {"kind": "document", "file_size": doc.size, "mime_type": doc.mime_type}
+
+        attr_sticker, attr_video, attr_audio, attr_animated = None, None, None, None
+        for attr in doc.attributes:
+            if isinstance(attr, types.DocumentAttributeSticker):
+                attr_sticker = attr
+
+            elif isinstance(attr, types.DocumentAttributeVideo):
+                attr_video = attr
+                result["width"], result["height"] = attr.w, attr.h
+                result["duration"] = attr.duration
+                result["supports_streaming"] = bool(attr.supports_streaming)
+
+            elif isinstance(attr, types.DocumentAttributeAudio):
+                attr_audio = attr
+                result["duration"] = attr.duration
+
+            elif isinstance(attr, types.DocumentAttributeFilename):
+                result["file_name"] = attr.file_name
+
+            elif isinstance(attr, types.DocumentAttributeAnimated):
+                attr_animated = attr
+
+            elif isinstance(attr, types.DocumentAttributeImageSize):
+                result.setdefault("width", attr.w)
+                result.setdefault("height", attr.h)
+
+        if attr_sticker:
+            if isinstance(attr_sticker.stickerset, types.InputStickerSetShortName):
+                short_name = attr_sticker.stickerset.short_name
+
+            else:
+                sticker_set_res = await ClientPool.client()(
+                    GetStickerSetRequest(stickerset=attr_sticker.stickerset, hash=0))
+                short_name = getattr(sticker_set_res.set, "short_name", None)
+
+            result.update(kind="sticker", set_name=short_name, emoji=attr_sticker.alt)
+
+        elif attr_audio:
+            result["kind"] = "voice" if attr_audio.voice else "audio"
+
+        elif attr_animated and attr_video:
+            result["kind"] = "gif"
+
+        elif attr_video:
+            result["kind"] = "video"
+
+        return result
+
+    @classmethod
+    async def get_media_attributes(cls, msg_obj: types.Message) -> Optional[Dict]:
+        media_id = await cls.media_id(msg_obj)
+        if media_id is None:
+            return None
+
+        attributes = cls.MEDIA_ATTRIBUTES.get(media_id)
+        if attributes is None:
+            cls.MEDIA_ATTRIBUTES_MISSES += 1
+            attributes = await cls.extract_media_attributes(msg_obj)
+
+        else:
+            cls.MEDIA_ATTRIBUTES_HITS += 1
+
+        cls.MEDIA_ATTRIBUTES[media_id] = attributes
+        cls.MEDIA_ATTRIBUTES.move_to_end(media_id)
+        while len(cls.MEDIA_ATTRIBUTES) > Config.MEDIA_INFO_CACHE_SIZE:
+            cls.MEDIA_ATTRIBUTES.popitem(last=False)
+
+        return attributes
+
+    @classmethod
+    async def get_media_data_from_msg(cls, msg_obj: types.Message):
+        attributes = await cls.get_media_attributes(msg_obj)
+        if attributes is None:
+            return 1, None
+
+        kind = attributes["kind"]
+        if kind == "photo":
             media = MediaPhoto(
-                file_size=best_size["size_bytes"],
-                mime_type="image/jpeg",
-                width=best_size["w"],
-                height=best_size["h"],
+                file_size=attributes["file_size"],
+                mime_type=attributes["mime_type"],
+                width=attributes["width"],
+                height=attributes["height"],
             )
-            msg_type = 2
-
-        elif isinstance(msg_obj.media, types.MessageMediaDocument):
-            doc = msg_obj.media.document
-
-            attr_sticker, attr_video, attr_audio, attr_filename, attr_animated = None, None, None, None, None
-            for attr in doc.attributes:
-                if isinstance(attr, types.DocumentAttributeSticker):
-                    attr_sticker = attr
-
-                elif isinstance(attr, types.DocumentAttributeVideo):
-                    attr_video = attr
-
-                elif isinstance(attr, types.DocumentAttributeAudio):
-                    attr_audio = attr
-
-                elif isinstance(attr, types.DocumentAttributeFilename):
-                    attr_filename = attr
-
-                elif isinstance(attr, types.DocumentAttributeAnimated):
-                    attr_animated = attr
-
-            if attr_sticker:
-                if isinstance(attr_sticker.stickerset, types.InputStickerSetShortName):
-                    short_name = attr_sticker.stickerset.short_name
-
-                else:
-                    sticker_set_res = await Config.TG_CLIENT(
-                        GetStickerSetRequest(stickerset=attr_sticker.stickerset, hash=0))
-                    short_name = getattr(sticker_set_res.set, "short_name", None)
-
-                media = MediaSticker(
-                    file_size=doc.size,
-                    mime_type=doc.mime_type,
-                    set_name=short_name,
-                    emoji=attr_sticker.alt
-                )
-                msg_type = 4
-
-            elif attr_audio:
-                media = MediaAudio(
-                    file_size=doc.size,
-                    mime_type=doc.mime_type,
-                    duration=attr_audio.duration,
-                    is_voice=attr_audio.voice
-                )
-                msg_type = 7
-
-            elif attr_animated:
-                media = MediaVideoGIF(
-                    file_size=doc.size,
-                    mime_type="image/gif",
-                    duration=attr_video.duration,
-                    width=attr_video.w,
-                    height=attr_video.h,
-                    supports_streaming=attr_video.supports_streaming
-                )
-                msg_type = 11
-
-            elif attr_video:
-                media = MediaVideoGIF(
-                    file_size=doc.size,
-                    mime_type=doc.mime_type,
-                    duration=attr_video.duration,
-                    width=attr_video.w,
-                    height=attr_video.h,
-                    supports_streaming=attr_video.supports_streaming
-                )
-                msg_type = 11
-
-            elif attr_filename:
-                media = MediaDocument(
-                    file_size=doc.size,
-                    mime_type=doc.mime_type,
-                    file_name=attr_filename.file_name
-                )
-                msg_type = 6
+            return 2, media
+
+        elif kind == "sticker":
+            media = MediaSticker(
+                file_size=attributes["file_size"],
+                mime_type=attributes["mime_type"],
+                set_name=attributes["set_name"],
+                emoji=attributes["emoji"]
+            )
+            return 4, media
+
+        elif kind in ("voice", "audio"):
+            media = MediaAudio(
+                file_size=attributes["file_size"],
+                mime_type=attributes["mime_type"],
+                duration=attributes["duration"],
+                is_voice=kind == "voice"
+            )
+            return 7, media
+
+        elif kind in ("gif", "video"):
+            media = MediaVideoGIF(
+                file_size=attributes["file_size"],
+                mime_type="image/gif" if kind == "gif" else attributes["mime_type"],
+                duration=attributes["duration"],
+                width=attributes["width"],
+                height=attributes["height"],
+                supports_streaming=attributes["supports_streaming"]
+            )
+            return 11, media
 
-        return msg_type, media
+        elif attributes.get("file_name"):
+            media = MediaDocument(
+                file_size=attributes["file_size"],
+                mime_type=attributes["mime_type"],
+                file_name=attributes["file_name"]
+            )
+            return 6, media
+
+        return 1, None
+
+    @classmethod
+    async def get_media_file_info(cls, msg_obj: types.Message) -> Optional[MediaFileInfo]:
+        attributes = await cls.get_media_attributes(msg_obj)
+        if attributes is None:
+            return None
+
+        return MediaFileInfo(
+            file_type="video" if attributes["kind"] == "gif" else attributes["kind"],
+            file_name=attributes.get("file_name"),
+            mime_type=attributes["mime_type"],
+            file_size=attributes["file_size"],
+            width=attributes.get("width"),
+            height=attributes.get("height"),
+            created_at=msg_obj.date.isoformat()
+        )
+
+    @classmethod
+    async def media_cache_stats(cls) -> Dict:
+        return {
+            "size": len(cls.MEDIA_ATTRIBUTES),
+            "hits": cls.MEDIA_ATTRIBUTES_HITS,
+            "misses": cls.MEDIA_ATTRIBUTES_MISSES
+        }
 
     @staticmethod
     async def get_topic_data_from_msg(msg_obj: types.Message, only_id: bool = False, use_cache: bool = True):
@@ -191,7 +276,8 @@ class TgTools:
 
             if (not title) or (not icon_color):
                 flag_update_cache = True
-                topic_data = await Config.TG_CLIENT(GetForumTopicsByIDRequest(peer=msg_obj.peer_id, topics=[topic_id]))
+                topic_data = await ClientPool.client()(
+                    GetForumTopicsByIDRequest(peer=msg_obj.peer_id, topics=[topic_id]))
                 if topic_data:
                     title = topic_data.topics[0].title
                     icon_color = topic_data.topics[0].icon_color
@@ -0,0 +1,268 @@
+import asyncio
+import os
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from telethon import TelegramClient, utils
+from telethon.errors import FileReferenceExpiredError, FileReferenceInvalidError
+from telethon.tl import types
+
+from app.config import Config
+from app.tg.client_pool import ClientPool
+from app.tg.media_stream import MediaDescriptors
+from app.utils import Utils as Ut
+
+
+class ThumbnailService:
+    MEMORY: "OrderedDict[str, bytes]" = OrderedDict()
+    KEYS: "OrderedDict[Tuple[str, int, int, int], str]" = OrderedDict()
+    DISK: "OrderedDict[str, int]" = OrderedDict()
+    INFLIGHT: Dict[Tuple[str, int, int, int], asyncio.Task] = {}
+    DISK_BYTES = 0
+    MEMORY_HITS = 0
+    DISK_HITS = 0
+    DOWNLOADS = 0
+    SHARED_LOADS = 0
+    EVICTIONS = 0
+
+    @staticmethod
+    async def locate(media) -> Optional[Tuple[object, Optional[int], List]]:
+        if isinstance(media, types.MessageMediaPhoto) and isinstance(media.photo, types.Photo):
+            photo = media.photo
+            return photo, photo.dc_id, photo.sizes
+
+        if isinstance(media, types.MessageMediaDocument) and isinstance(media.document, types.Document):
+            document = media.document
+            return document, document.dc_id, document.thumbs or []
+
+        return None
+
+    @staticmethod
+    async def input_location(media_obj, size_type: str):
+        if isinstance(media_obj, types.Photo):
+            return types.InputPhotoFileLocation(
+                id=media_obj.id, access_hash=media_obj.access_hash, file_reference=media_obj.file_reference,
+                thumb_size=size_type
+            )
+
+        return types.InputDocumentFileLocation(
+            id=media_obj.id, access_hash=media_obj.access_hash, file_reference=media_obj.file_reference,
+            thumb_size=size_type
+        )
+
+    @staticmethod
+    async def mime_type(data: bytes) -> str:
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            return "image/webp"
+
+        if data[:8] == b"\x89PNG\r\n\x1a\n":
+            return "image/png"
+
+        return "image/jpeg"
+
+    @staticmethod
+    async def thumb_path(cache_key: str) -> str:
+        return os.path.join(Config.THUMB_CACHE_DIR, f"{cache_key}.thumb")
+
+    @staticmethod
+    def read_file(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def write_file(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def scan_dir() -> List[Tuple[float, str, int]]:
+        found = []
+        with os.scandir(Config.THUMB_CACHE_DIR) as files:
+            for file in files:
+                if file.is_file(follow_symlinks=False) and file.name.endswith(".thumb"):
+                    stat = file.stat()
+                    found.append((stat.st_atime, file.name[:-len(".thumb")], stat.st_size))
+
+        return sorted(found)
+
+    @classmethod
+    async def init_cache(cls):
+        if Config.THUMB_CACHE_MAX_BYTES <= 0:
+            return
+
+        os.makedirs(Config.THUMB_CACHE_DIR, exist_ok=True)
+        for _, cache_key, size in await asyncio.to_thread(cls.scan_dir):
+            cls.DISK[cache_key] = size
+            cls.DISK_BYTES += size
+
+        await cls.evict()
+        Config.LOGGER.info(f"ThumbnailService | Loaded {len(cls.DISK)} thumbnails, {cls.DISK_BYTES} bytes")
+
+    @classmethod
+    async def forget(cls, cache_key: str):
+        size = cls.DISK.pop(cache_key, None)
+        if size is None:
+            return
+
+        cls.DISK_BYTES -= size
+        try:
+            os.remove(await cls.thumb_path(cache_key))
+
+        except OSError:
+            pass
+
+    @classmethod
+    async def evict(cls):
+        while cls.DISK and cls.DISK_BYTES > Config.THUMB_CACHE_MAX_BYTES:
+            await cls.forget(next(iter(cls.DISK)))
+            cls.EVICTIONS += 1
+
+    @classmethod
+    async def store(cls, cache_key: str, data: bytes):
+        await cls.remember(cache_key, data)
+        if cache_key in cls.DISK or not data or len(data) > Config.THUMB_CACHE_MAX_BYTES:
+            return
+
+        try:
+            await asyncio.to_thread(cls.write_file, await cls.thumb_path(cache_key), data)
+
+        except OSError as ex:
+            Config.LOGGER.warning(f"ThumbnailService | Unable to store {cache_key}! ex: {ex}")
+            return
+
+        cls.DISK[cache_key] = len(data)
+        cls.DISK_BYTES += len(data)
+        await cls.evict()
+
+    @classmethod
+    async def remember(cls, cache_key: str, data: bytes):
+        cls.MEMORY[cache_key] = data
+        cls.MEMORY.move_to_end(cache_key)
+        while len(cls.MEMORY) > Config.THUMB_MEMORY_CACHE_SIZE:
+            cls.MEMORY.popitem(last=False)
+
+    @classmethod
+    async def cached(cls, cache_key: str) -> Optional[bytes]:
+        data = cls.MEMORY.get(cache_key)
+        if data is not None:
+            cls.MEMORY_HITS += 1
+            cls.MEMORY.move_to_end(cache_key)
+            return data
+
+        if cache_key not in cls.DISK:
+            return None
+
+        data = await asyncio.to_thread(cls.read_file, await cls.thumb_path(cache_key))
+        if data is None:
+            await cls.forget(cache_key)
+            return None
+
+        cls.DISK_HITS += 1
+        cls.DISK.move_to_end(cache_key)
+        await cls.remember(cache_key, data)
+        return data
+
+    @classmethod
+    async def download(cls, client: TelegramClient, chat_id: int, msg_id: int, media) -> Optional[Tuple[str, bytes]]:
+        located = await cls.locate(media)
+        if located is None:
+            return None
+
+        media_obj, dc_id, sizes = located
+        best = await Ut.best_photo_size(max_side=Config.THUMB_MAX_SIDE, sizes=sizes)
+        if best is None:
+            return None
+
+        size = best["size"]
+
+        cache_key = f"{media_obj.id}-{size.type}"
+        data = await cls.cached(cache_key)
+        if data is not None:
+            return cache_key, data
+
+        if isinstance(size, types.PhotoStrippedSize):
+            data = utils.stripped_photo_to_jpg(size.bytes)
+
+        elif isinstance(size, types.PhotoCachedSize):
+            data = size.bytes
+
+        else:
+            cls.DOWNLOADS += 1
+            try:
+                data = await client.download_file(
+                    await cls.input_location(media_obj, size.type), bytes, dc_id=dc_id)
+
+            except (FileReferenceExpiredError, FileReferenceInvalidError):
+                media = await MediaDescriptors.fetch_media(client, chat_id, msg_id)
+                located = await cls.locate(media)
+                if located is None:
+                    return None
+
+                data = await client.download_file(
+                    await cls.input_location(located[0], size.type), bytes, dc_id=dc_id)
+
+        await cls.store(cache_key, data)
+        return cache_key, data
+
+    @classmethod
+    async def load(cls, client: TelegramClient, chat_id: int, msg_id: int,
+                   key: Tuple[str, int, int, int]) -> Optional[bytes]:
+        media = await MediaDescriptors.fetch_media(client, chat_id, msg_id)
+        result = await cls.download(client, chat_id, msg_id, media) if media else None
+        if result is None:
+            return None
+
+        cache_key, data = result
+        cls.KEYS[key] = cache_key
+        while len(cls.KEYS) > Config.THUMB_MEMORY_CACHE_SIZE:
+            cls.KEYS.popitem(last=False)
+
+        return data
+
+    @classmethod
+    def finished(cls, key: Tuple[str, int, int, int], task: asyncio.Task):
+        if cls.INFLIGHT.get(key) is task:
+            cls.INFLIGHT.pop(key)
+
+    @classmethod
+    async def get(cls, client: TelegramClient, chat_id: int, msg_id: int) -> Optional[Tuple[bytes, str]]:
+        key = (ClientPool.session_name(), chat_id, msg_id, Config.THUMB_MAX_SIDE)
+        cache_key = cls.KEYS.get(key)
+        data = await cls.cached(cache_key) if cache_key else None
+
+        if data is None:
+            task = cls.INFLIGHT.get(key)
+            if task is None:
+                task = cls.INFLIGHT[key] = asyncio.create_task(cls.load(client, chat_id, msg_id, key))
+                task.add_done_callback(partial(cls.finished, key))
+
+            else:
+                cls.SHARED_LOADS += 1
+
+            data = await asyncio.shield(task)
+            if data is None:
+                return None
+
+        return data, await cls.mime_type(data)
+
+    @classmethod
+    async def stats(cls) -> Dict:
+        return {
+            "memory": len(cls.MEMORY),
+            "disk": len(cls.DISK),
+            "disk_bytes": cls.DISK_BYTES,
+            "memory_hits": cls.MEMORY_HITS,
+            "disk_hits": cls.DISK_HITS,
+            "downloads": cls.DOWNLOADS,
+            "shared_loads": cls.SHARED_LOADS,
+            "evictions": cls.EVICTIONS,
+        }
@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote, urlparse
+
+from aiohttp import ClientResponse
+from telethon import TelegramClient, helpers, utils
+from telethon.errors import FloodWaitError, RPCError
+from telethon.network import MTProtoSender
+from telethon.tl import types
+from telethon.tl.functions.upload import SaveBigFilePartRequest, SaveFilePartRequest
+
+from app.config import Config
+from app.tg.telethon_compat import TelethonCompat
+
+UploadedFile = Union[types.InputFile, types.InputFileBig]
+
+
+class UploadProgress:
+
+    def __init__(self, file_name: str, size: int, total_parts: int):
+        self.file_name = file_name
+        self.size = size
+        self.total_parts = total_parts
+        self.uploaded_parts = 0
+        self.uploaded_bytes = 0
+        self.retries = 0
+        self.started_at = time.monotonic()
+
+    def as_dict(self) -> Dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "file_name": self.file_name,
+            "size": self.size,
+            "parts": f"{self.uploaded_parts}/{self.total_parts}",
+            "uploaded_bytes": self.uploaded_bytes,
+            "retries": self.retries,
+            "bytes_per_sec": round(self.uploaded_bytes / elapsed),
+        }
+
+
+class MediaUploader:
+    BIG_FILE_SIZE = 10 * 1024 * 1024
+
+    SEMAPHORE: Optional[asyncio.Semaphore] = None
+    SENDERS: Dict[int, List[MTProtoSender]] = {}
+    SENDER_LOCKS: Dict[int, asyncio.Lock] = {}
+    ACTIVE: Dict[int, UploadProgress] = {}
+    UPLOADS = 0
+    FALLBACKS = 0
+    PART_RETRIES = 0
+    BYTES_UPLOADED = 0
+
+    @classmethod
+    async def semaphore(cls) -> asyncio.Semaphore:
+        if cls.SEMAPHORE is None:
+            cls.SEMAPHORE = asyncio.Semaphore(Config.UPLOAD_MAX_CONCURRENT)
+
+        return cls.SEMAPHORE
+
+    @staticmethod
+    async def is_url(file) -> bool:
+        return isinstance(file, str) and re.match(r"https?://", file) is not None
+
+    @classmethod
+    async def is_big_local_file(cls, file) -> bool:
+        return isinstance(file, str) and os.path.isfile(file) and os.path.getsize(file) > cls.BIG_FILE_SIZE
+
+    @staticmethod
+    async def file_name(url: str, response: ClientResponse) -> str:
+        disposition = response.content_disposition
+        if disposition and disposition.filename:
+            return disposition.filename
+
+        name = os.path.basename(unquote(urlparse(url).path)) or "file"
+        if not os.path.splitext(name)[1]:
+            name += mimetypes.guess_extension(response.content_type or "") or ""
+
+        return name
+
+    @classmethod
+    async def senders(cls, client: TelegramClient) -> List[Callable[[object], Awaitable]]:
+        lock = cls.SENDER_LOCKS.setdefault(id(client), asyncio.Lock())
+        async with lock:
+            extra = cls.SENDERS.setdefault(id(client), [])
+            extra[:] = [sender for sender in extra if sender.is_connected()]
+            while TelethonCompat.private_api_supported() and len(extra) < Config.UPLOAD_PARALLELISM - 1:
+                try:
+                    extra.append(await TelethonCompat.connect_sender(client))
+
+                except Exception as ex:
+                    Config.LOGGER.warning(f"MediaUploader | Unable to open an upload connection! ex: {ex}")
+                    break
+
+            return [client] + [sender.send for sender in extra]
+
+    @classmethod
+    async def drop_sender(cls, client: TelegramClient, invoke: Callable[[object], Awaitable]):
+        extra = cls.SENDERS.get(id(client), [])
+        for sender in extra:
+            if sender.send == invoke:
+                extra.remove(sender)
+                await sender.disconnect()
+                return
+
+    @classmethod
+    async def disconnect(cls):
+        for senders in cls.SENDERS.values():
+            for sender in senders:
+                await sender.disconnect()
+
+        cls.SENDERS.clear()
+
+    @classmethod
+    async def save_part(cls, invoke: Callable[[object], Awaitable], client: TelegramClient, file_id: int,
+                        index: int, total_parts: int, chunk: bytes, is_big: bool, progress: UploadProgress):
+        if is_big:
+            request = SaveBigFilePartRequest(
+                file_id=file_id, file_part=index, file_total_parts=total_parts, bytes=chunk)
+
+        else:
+            request = SaveFilePartRequest(file_id=file_id, file_part=index, bytes=chunk)
+
+        for attempt in range(Config.UPLOAD_PART_RETRIES + 1):
+            try:
+                if await invoke(request):
+                    return
+
+                ex = RuntimeError(f"Telegram rejected part {index} of file {file_id}")
+
+            except FloodWaitError as flood:
+                if flood.seconds > Config.UPLOAD_FLOOD_SLEEP_THRESHOLD:
+                    raise
+
+                await asyncio.sleep(flood.seconds)
+                ex = flood
+
+            except (RPCError, ConnectionError, asyncio.TimeoutError) as err:
+                ex = err
+                if invoke is not client and not isinstance(err, RPCError):
+                    await cls.drop_sender(client, invoke)
+
+                invoke = client
+
+            if attempt == Config.UPLOAD_PART_RETRIES:
+                raise ex
+
+            cls.PART_RETRIES += 1
+            progress.retries += 1
+            Config.LOGGER.warning(f"MediaUploader | Retrying part {index}/{total_parts} of {file_id}. ex: {ex}")
+            await asyncio.sleep(min(2 ** attempt, 10))
+
+    @classmethod
+    async def send_parts(cls, invoke: Callable[[object], Awaitable], client: TelegramClient, parts: asyncio.Queue,
+                         file_id: int, total_parts: int, is_big: bool, progress: UploadProgress):
+        while True:
+            item = await parts.get()
+            if item is None:
+                return
+
+            index, chunk = item
+            await cls.save_part(invoke, client, file_id, index, total_parts, chunk, is_big, progress)
+            progress.uploaded_parts += 1
+            progress.uploaded_bytes += len(chunk)
+            cls.BYTES_UPLOADED += len(chunk)
+
+    @staticmethod
+    async def put_part(parts: asyncio.Queue, workers: List[asyncio.Task], item: Optional[Tuple[int, bytes]]):
+        put = asyncio.ensure_future(parts.put(item))
+        while not put.done():
+            running = [worker for worker in workers if not worker.done()]
+            if running:
+                await asyncio.wait([put, *running], return_when=asyncio.FIRST_COMPLETED)
+
+            for worker in workers:
+                if worker.done() and not worker.cancelled() and worker.exception() is not None:
+                    put.cancel()
+                    raise worker.exception()
+
+            if not running and not put.done():
+                put.cancel()
+                raise RuntimeError("Upload workers stopped before all parts were sent")
+
+    @classmethod
+    async def upload_stream(cls, client: TelegramClient, read: Callable[[int], Awaitable[bytes]], size: int,
+                            file_name: str) -> UploadedFile:
+        part_size = utils.get_appropriated_part_size(size) * 1024
+        total_parts = (size + part_size - 1) // part_size
+        is_big = size > cls.BIG_FILE_SIZE
+        md5 = None if is_big else hashlib.md5()
+        file_id = helpers.generate_random_long()
+
+        senders = await cls.senders(client) if is_big else [client]
+        progress = cls.ACTIVE[file_id] = UploadProgress(file_name, size, total_parts)
+        parts = asyncio.Queue(maxsize=Config.UPLOAD_BUFFER_PARTS)
+        workers = [
+            asyncio.create_task(cls.send_parts(invoke, client, parts, file_id, total_parts, is_big, progress))
+            for invoke in senders
+        ]
+        try:
+            for index in range(total_parts):
+                chunk = await read(min(part_size, size - index * part_size))
+                if md5 is not None:
+                    md5.update(chunk)
+
+                await cls.put_part(parts, workers, (index, chunk))
+
+            for _ in senders:
+                await cls.put_part(parts, workers, None)
+
+            await asyncio.gather(*workers)
+
+        finally:
+            cls.ACTIVE.pop(file_id, None)
+            for worker in workers:
+                worker.cancel()
+
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        cls.UPLOADS += 1
+        Config.LOGGER.info(f"MediaUploader | Uploaded {file_name}: {progress.as_dict()}")
+        if is_big:
+            return types.InputFileBig(id=file_id, parts=total_parts, name=file_name)
+
+        return types.InputFile(id=file_id, parts=total_parts, name=file_name, md5_checksum=md5.hexdigest())
+
+    @classmethod
+    async def upload_url(cls, client: TelegramClient, url: str) -> Optional[Tuple[UploadedFile, Optional[str]]]:
+        async with await cls.semaphore():
+            async with Config.AIOHTTP_SESSION.get(url, headers={"Accept-Encoding": "identity"}) as response:
+                response.raise_for_status()
+
+                encoding = response.headers.get("Content-Encoding", "identity").lower()
+                if not response.content_length or response.content_length < Config.UPLOAD_URL_MIN_SIZE or \
+                        encoding != "identity":
+                    cls.FALLBACKS += 1
+                    return None
+
+                uploaded = await cls.upload_stream(
+                    client, response.content.readexactly, response.content_length, await cls.file_name(url, response)
+                )
+                return uploaded, response.content_type
+
+    @classmethod
+    async def upload_path(cls, client: TelegramClient, path: str) -> UploadedFile:
+        async with await cls.semaphore():
+            with open(path, "rb") as f:
+                return await cls.upload_stream(
+                    client, lambda size: asyncio.to_thread(f.read, size), os.path.getsize(path),
+                    os.path.basename(path)
+                )
+
+    @classmethod
+    async def stats(cls) -> dict:
+        return {
+            "uploads": cls.UPLOADS,
+            "fallbacks": cls.FALLBACKS,
+            "part_retries": cls.PART_RETRIES,
+            "bytes_uploaded": cls.BYTES_UPLOADED,
+            "active": [progress.as_dict() for progress in cls.ACTIVE.values()],
+        }
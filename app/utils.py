@@ -1,10 +1,11 @@
 import asyncio
 import os
 import logging
+from collections import deque
 from datetime import datetime
 from logging import Logger
 from pathlib import Path
-from typing import Dict, Union
+from typing import Dict, Optional, Union
 
 from telethon import TelegramClient, errors as te
 from telethon.errors import PeerIdInvalidError
@@ -13,14 +14,44 @@ from telethon.tl import types
 from app.config import Config, LOG_LIST
 
 
+class LatencyWindow:
+    def __init__(self, size: int = 1000):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+
+    def percentiles(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"count": self.count, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return {
+            "count": self.count,
+            "p50": round(ordered[int(last * 0.5)], 4),
+            "p90": round(ordered[int(last * 0.9)], 4),
+            "p99": round(ordered[int(last * 0.99)], 4),
+            "max": round(ordered[last], 4),
+        }
+
+
 class Utils:
     STATUS_SUCCESS = "success"
     STATUS_FAIL = "fail"
+    STATUS_PARTIAL = "partial"
+    STATUS_MERGED = "merged"
+    STATUS_DUPLICATE = "duplicate"
+    STATUS_IN_PROGRESS = "in_progress"
 
     @staticmethod
     async def init_telegram_client(retries: int = 3) -> bool:
         try:
-            Config.TG_CLIENT = TelegramClient(session="work-app", api_id=Config.TG_API_ID, api_hash=Config.TG_API_HASH)
+            Config.TG_CLIENT = TelegramClient(
+                session=Config.TG_SESSION_NAME, api_id=Config.TG_API_ID, api_hash=Config.TG_API_HASH,
+                flood_sleep_threshold=0)
             await Config.TG_CLIENT.start(phone=Config.PHONE_NUMBER)
             return True
 
@@ -116,12 +147,16 @@ class Utils:
             )
 
     @staticmethod
-    async def best_photo_size(photo) -> Union[Dict, None]:
+    async def best_photo_size(photo=None, max_side: Optional[int] = None, sizes=None) -> Union[Dict, None]:
         best = None
         best_pixels = -1
+        smallest = None
+        smallest_pixels = None
+        stripped = None
 
-        for s in photo.sizes:
+        for s in (photo.sizes if photo is not None else sizes) or []:
             if isinstance(s, types.PhotoStrippedSize):
+                stripped = {"w": None, "h": None, "size_bytes": len(s.bytes), "size": s}
                 continue
 
             if isinstance(s, types.PhotoSize):
@@ -130,15 +165,26 @@ class Utils:
             elif isinstance(s, types.PhotoSizeProgressive):
                 w, h = s.w, s.h
                 size_bytes = s.sizes[-1] if s.sizes else None
+            elif isinstance(s, types.PhotoCachedSize):
+                w, h = s.w, s.h
+                size_bytes = len(s.bytes)
             else:
                 continue
 
+            candidate = {"w": w, "h": h, "size_bytes": size_bytes, "size": s}
             pixels = (w or 0) * (h or 0)
-            if pixels > best_pixels:
+            if (max_side is None or max(w or 0, h or 0) <= max_side) and pixels > best_pixels:
                 best_pixels = pixels
-                best = {"w": w, "h": h, "size_bytes": size_bytes}
+                best = candidate
+
+            if smallest_pixels is None or pixels < smallest_pixels:
+                smallest_pixels = pixels
+                smallest = candidate
+
+        if max_side is None:
+            return best
 
-        return best
+        return best or smallest or stripped
 
     @staticmethod
     async def logging_queue():